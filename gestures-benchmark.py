@@ -0,0 +1,66 @@
+import time
+
+import objc_util
+import ui
+
+from ui3.gestures import *
+
+DELEGATE_COUNT = 500
+
+
+@objc_util.on_main_thread
+def benchmark_delegate_creation():
+    view = ui.View()
+    noop = lambda data: None
+
+    start = time.perf_counter()
+    for _ in range(DELEGATE_COUNT):
+        UIGestureRecognizerDelegate(UITapGestureRecognizer, view, noop)
+    elapsed = time.perf_counter() - start
+    print(f'Gesture delegates created: {DELEGATE_COUNT / elapsed:,.0f}/s')
+
+
+@objc_util.on_main_thread
+def benchmark_dispatch(events=5000):
+    view = ui.View()
+    noop = lambda data: None
+    for gesture in (tap, pan, pinch, rotation):
+        handler = gesture(view, noop)
+        for reuse in (False, True):
+            handler.reuse_data = reuse
+            start = time.perf_counter()
+            for _ in range(events):
+                handler.gestureAction()
+            elapsed = time.perf_counter() - start
+            print(f'{gesture.__name__} events{" (reused data)" if reuse else ""}: '
+                  f'{events / elapsed:,.0f}/s')
+
+
+@objc_util.on_main_thread
+def benchmark_router(columns=25, rows=20, hits=20000):
+    container = ui.View(frame=(0, 0, columns * 48, rows * 48))
+    tiles = []
+    for i in range(columns * rows):
+        tile = ui.View(frame=(i % columns * 48, i // columns * 48, 40, 40))
+        container.add_subview(tile)
+        tiles.append(tile)
+    noop = lambda data: None
+
+    start = time.perf_counter()
+    router = GestureRouter(container)
+    for tile in tiles:
+        router.tap(tile, noop)
+    elapsed = time.perf_counter() - start
+    print(f'Tiles registered with GestureRouter: {len(tiles) / elapsed:,.0f}/s')
+
+    start = time.perf_counter()
+    for i in range(hits):
+        router.hit(i % (columns * 48), i % (rows * 48))
+    elapsed = time.perf_counter() - start
+    print(f'GestureRouter hit tests: {hits / elapsed:,.0f}/s')
+
+
+if __name__ == '__main__':
+    benchmark_delegate_creation()
+    benchmark_dispatch()
+    benchmark_router()
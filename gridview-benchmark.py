@@ -0,0 +1,69 @@
+import time
+
+import objc_util
+import ui
+
+from ui3.gridview import GridView
+
+ITEM_COUNT = 1000
+ROUNDS = 20
+
+
+@objc_util.on_main_thread
+def benchmark():
+    grid = GridView(frame=(0, 0, 1000, 1000))
+    for _ in range(ITEM_COUNT):
+        grid.add_subview(ui.View())
+    grid.layout()
+
+    sizes = [(1000, 1000), (800, 1000), (1000, 800)] * ROUNDS
+
+    start = time.perf_counter()
+    for size in sizes:
+        grid.frame = (0, 0, *size)
+        grid.layout()
+    per_resize = (time.perf_counter() - start) / len(sizes) * 1000
+    print(f'Resize with {ITEM_COUNT} items: {per_resize:.2f} ms')
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        grid.layout()
+    per_layout = (time.perf_counter() - start) / ROUNDS * 1000
+    print(f'Layout with no changes: {per_layout:.2f} ms')
+
+
+class ColorSource:
+
+    def __init__(self, count):
+        self.count = count
+
+    def gridview_number_of_items(self, gridview):
+        return self.count
+
+    def gridview_configure_cell(self, gridview, cell, index):
+        cell.background_color = (index % 256 / 255, 0.5, 0.5)
+
+
+@objc_util.on_main_thread
+def benchmark_data_source(count=20000, steps=500):
+    grid = GridView(
+        data_source=ColorSource(count),
+        count_x=5,
+        frame=(0, 0, 500, 800),
+    )
+    grid.layout()
+    scroll_view = grid.scroll_view
+    max_offset = scroll_view.content_size[1] - scroll_view.height
+
+    start = time.perf_counter()
+    for step in range(steps):
+        scroll_view.content_offset = (0, max_offset * step / steps)
+        grid.scrollview_did_scroll(scroll_view)
+    per_step = (time.perf_counter() - start) / steps * 1000
+    print(f'Scroll step with {count} data source items: {per_step:.2f} ms, '
+          f'{len(scroll_view.subviews)} cells allocated')
+
+
+if __name__ == '__main__':
+    benchmark()
+    benchmark_data_source()
@@ -0,0 +1,33 @@
+import time
+
+from ui3.momentum import ManualClock, Momentum, numpy
+
+OBJECT_COUNTS = (1, 100, 1000)
+SECONDS = 1.0
+
+
+def run(count, vectorized):
+    clock = ManualClock()
+    engine = Momentum(clock=clock, vectorized=vectorized)
+    for i in range(count):
+        engine.fling(
+            i, (1000, 1000), (3000 - 6 * (i % 1000), 1500 - 3 * (i % 1000)),
+            update=lambda x, y: None,
+            bounds=(0, 0, 2000, 2000),
+            snap_points=[(0, 0), (1000, 1000), (2000, 2000)] if i % 2 else None,
+        )
+    start = time.perf_counter()
+    clock.advance(SECONDS)
+    elapsed = time.perf_counter() - start
+    frames = round(SECONDS * 60)
+    return elapsed / frames * 1000, count * engine.steps / elapsed
+
+
+if __name__ == '__main__':
+    modes = (False, True) if numpy is not None else (False,)
+    for vectorized in modes:
+        print('numpy arrays:' if vectorized else 'Lists:')
+        for count in OBJECT_COUNTS:
+            per_frame, rate = run(count, vectorized)
+            print(f'{count:5} objects: {per_frame:.3f} ms/frame, '
+                  f'{rate:,.0f} object-steps/s')
@@ -0,0 +1,161 @@
+import os
+import sys
+import time
+
+from ui3 import markup
+
+try:
+    import bs4
+except ImportError:
+    bs4 = None
+
+PARSE_ROUNDS = 2000
+RICH_TEXT_ROUNDS = 500
+LABEL_ROUNDS = 500
+
+SAMPLES = [
+    'OK',
+    '<b>Status:</b> <c green>online</c>',
+    '<f Courier 12>12:00:01</f> <c grey>[info]</c> Connected to <b>server</b>',
+    '\n'.join([
+        '<b>Bold <i>italic</i></b>',
+        'and <i><f system 32>just</f> italic</i>',
+        '<u lightgrey>Outlines:</u>',
+        '<o blue>COLORED</o> <o -3><c orange>FILLED</c></o>',
+        '<strike double red byword><oblique>really not cool</oblique></strike>',
+    ]),
+]
+
+
+def timed(func, rounds):
+    start = time.perf_counter()
+    for i in range(rounds):
+        func(SAMPLES[i % len(SAMPLES)])
+    return rounds / (time.perf_counter() - start)
+
+
+def benchmark_parse():
+    print('Markup parsed per second:')
+    print(f'  ui3.markup       {timed(markup.parse, PARSE_ROUNDS):,.0f}')
+    if bs4 is not None:
+        rate = timed(
+            lambda s: bs4.BeautifulSoup(s, 'html5lib'), PARSE_ROUNDS // 10)
+        print(f'  bs4 and html5lib {rate:,.0f}')
+
+
+def benchmark_import():
+    sys.modules.pop('ui3.richlabel', None)
+    start = time.perf_counter()
+    from ui3 import richlabel
+    elapsed = time.perf_counter() - start
+    print(f'Import ui3.richlabel: {elapsed * 1000:.1f} ms')
+
+    catalogue = richlabel.font_catalogue
+    for label in ('without cached file', 'with cached file'):
+        if label == 'without cached file' and os.path.exists(catalogue.path):
+            os.remove(catalogue.path)
+        catalogue.fonts = None
+        catalogue.refreshed = False
+        start = time.perf_counter()
+        'arial' in catalogue
+        elapsed = time.perf_counter() - start
+        print(f'First font check {label}: {elapsed * 1000:.1f} ms')
+
+
+def benchmark_label_creation():
+    import types
+    import objc_util
+    import ui
+    from ui3.richlabel import RichLabel
+
+    class PlainLabel(RichLabel):
+        font = ('Arial', 17)
+        number_of_lines = 0
+
+    def create_walking_dir(cls=PlainLabel):
+        # Binding as done before the plans were cached per class
+        target_instance = ui.Label()
+        for key in dir(cls):
+            if key.startswith('__'): continue
+            value = getattr(cls, key)
+            if callable(value) and type(value) is not type:
+                setattr(target_instance, key,
+                        types.MethodType(value, target_instance))
+            else:
+                setattr(target_instance, key, value)
+        return target_instance
+
+    @objc_util.on_main_thread
+    def run():
+        print('Labels created per second:')
+        for name, create in (
+            ('walking dir()', create_walking_dir),
+            ('binding plan', PlainLabel),
+        ):
+            start = time.perf_counter()
+            for _ in range(LABEL_ROUNDS):
+                create()
+            rate = LABEL_ROUNDS / (time.perf_counter() - start)
+            print(f'  {name:14} {rate:,.0f}')
+
+    run()
+
+
+def benchmark_rich_text():
+    import objc_util
+    from ui3.richlabel import RichLabel
+
+    @objc_util.on_main_thread
+    def run():
+        label = RichLabel(font=('Arial', 17))
+        cache = RichLabel.parse_cache
+        maxsize = cache.maxsize
+        print('rich_text calls per second:')
+        cache.maxsize = 0
+        cache.clear()
+        print(f'  uncached {timed(label.rich_text, RICH_TEXT_ROUNDS):,.0f}')
+        cache.maxsize = maxsize
+        print(f'  cached   {timed(label.rich_text, RICH_TEXT_ROUNDS):,.0f}')
+        print(f'  {cache}')
+        stats = label.run_stats
+        print(f'ObjC attribute calls: {stats.run_calls} '
+              f'(instead of {stats.attribute_calls})')
+
+        counter = RichLabel(font=('Arial', 17))
+        ticks = [f'<b>Elapsed</b> <c red>{i // 60:02d}</c>:{i % 60:02d}'
+                 for i in range(RICH_TEXT_ROUNDS)]
+        print('Counter updates per second:')
+        for name, method in (('rich_text', counter.rich_text),
+                             ('update_rich_text', counter.update_rich_text)):
+            start = time.perf_counter()
+            for tick in ticks:
+                method(tick)
+            rate = len(ticks) / (time.perf_counter() - start)
+            print(f'  {name:16} {rate:,.0f}')
+        print(f'  last update: {counter.update_stats}')
+
+        console = RichLabel(font=('Arial', 17))
+        console.append_limit = 100
+        log_lines = [f'<c grey>[{i}]</c> <b>event</b> {i}\n'
+                     for i in range(RICH_TEXT_ROUNDS)]
+        start = time.perf_counter()
+        for line in log_lines:
+            console.append_rich_text(line)
+        rate = len(log_lines) / (time.perf_counter() - start)
+        print(f'Log lines appended per second: {rate:,.0f}')
+
+        from ui3.richlabel import attribute_cache
+        print(f'Fonts, colors and shadows: {attribute_cache}, '
+              f'hit rate {attribute_cache.hit_rate:.0%}')
+
+    run()
+
+
+if __name__ == '__main__':
+    benchmark_parse()
+    try:
+        benchmark_import()
+        benchmark_label_creation()
+        benchmark_rich_text()
+    except ImportError:
+        print('RichLabel benchmarks need Pythonista')
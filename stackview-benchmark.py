@@ -0,0 +1,73 @@
+import time
+
+import objc_util
+import ui
+
+from ui3.anchor import *
+from ui3.stackview import StackView
+
+ROUNDS = 20
+LABEL_COUNT = 50
+
+
+def make_labels():
+    return [
+        ui.Label(text=f'Label number {i + 1}', number_of_lines=0)
+        for i in range(LABEL_COUNT)
+    ]
+
+
+def timed(func, rounds=ROUNDS):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+@objc_util.on_main_thread
+def benchmark():
+    container = ui.View(frame=(0, 0, 400, 3000))
+
+    def build_anchor_chain():
+        for view in container.subviews:
+            container.remove_subview(view)
+        labels = make_labels()
+        for i, label in enumerate(labels):
+            size_to_fit(label)
+            if i == 0:
+                dock(label).top(container)
+            else:
+                dock(label).below(labels[i - 1])
+
+    def build_stack():
+        stack = StackView(frame=(0, 0, 400, 3000))
+        for label in make_labels():
+            stack.add_subview(label)
+        stack.layout()
+
+    print(f'Build {LABEL_COUNT} labels:')
+    print(f'  anchor chain {timed(build_anchor_chain):.2f} ms')
+    print(f'  StackView    {timed(build_stack):.2f} ms')
+
+    stack = StackView(frame=(0, 0, 400, 3000))
+    for label in make_labels():
+        stack.add_subview(label)
+    stack.layout()
+
+    widths = iter([300, 400] * ROUNDS)
+
+    def resize_anchor_chain():
+        container.width = next(widths)
+
+    def resize_stack():
+        stack.width = next(widths)
+        stack.layout()
+
+    print(f'Resize with {LABEL_COUNT} labels:')
+    print(f'  anchor chain {timed(resize_anchor_chain):.2f} ms')
+    widths = iter([300, 400] * ROUNDS)
+    print(f'  StackView    {timed(resize_stack):.2f} ms')
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,52 @@
+import time
+from types import SimpleNamespace
+
+from ui3.textmeasure import MonospaceMeasure, TextMeasureCache
+
+EVALUATIONS = 100_000
+VIEW_COUNT = 100
+
+
+class SlowMonospaceMeasure(MonospaceMeasure):
+    ''' Stand-in with roughly the cost of a `sizeThatFits:` round trip. '''
+
+    def __call__(self, view, width=0, height=0):
+        deadline = time.perf_counter() + 20e-6
+        while time.perf_counter() < deadline:
+            pass
+        return super().__call__(view, width, height)
+
+
+def make_views():
+    return [
+        SimpleNamespace(
+            text=f'Label {i} with some text that wraps to several lines',
+            font=('<system>', 17),
+            number_of_lines=0,
+            width=200,
+        )
+        for i in range(VIEW_COUNT)
+    ]
+
+
+def run(measure_height):
+    views = make_views()
+    start = time.perf_counter()
+    for i in range(EVALUATIONS):
+        view = views[i % VIEW_COUNT]
+        if i % 1000 == 0:
+            view.text += '!'
+        measure_height(view)
+    return EVALUATIONS / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    uncached = SlowMonospaceMeasure()
+    rate = run(lambda view: uncached(view, view.width, 0)[1])
+    print(f'Uncached: {rate:,.0f} evaluations/s, {uncached.calls:,} measurements')
+
+    measure = SlowMonospaceMeasure()
+    cache = TextMeasureCache(measure)
+    rate = run(lambda view: cache.size(view, view.width, 0)[1])
+    print(f'Cached:   {rate:,.0f} evaluations/s, {measure.calls:,} measurements')
+    print(f'          {cache.cache}')
@@ -7,10 +7,16 @@ __version__ = '2021.01.10'
 
 # from more_itertools import collapse
 
-import ui
-
-from ui3.anchor import *
-from ui3.gestures import *
+try:
+    import ui
+except ImportError:
+    # Outside Pythonista, only the modules that do not need the ui module
+    # (e.g. ui3.textmeasure) can be imported
+    ui = None
+
+if ui is not None:
+    from ui3.anchor import *
+    from ui3.gestures import *
 
 
 def add_subviews(view, *subviews):
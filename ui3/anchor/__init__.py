@@ -17,7 +17,10 @@ from types import SimpleNamespace as ns
 import ui
 import objc_util
 
+from ui3.textmeasure import TextMeasureCache
+
 from .observer import on_change, remove_on_change
+from .transforms import TransformCache
 
 
 # TODO: lte, gte, in_range, in_range_angle, in_rect
@@ -781,41 +784,50 @@ def subview_max(view):
     return view.x, view.y, width, height
     
     
+def objc_text_size(view, width, height):
+    size = view.objc_instance.sizeThatFits_(objc_util.CGSize(width, height))
+    return size.width, size.height
+    
+    
+text_measure = TextMeasureCache(objc_text_size)
+
+
 def get_text_height(view):
-    size = view.objc_instance.sizeThatFits_(objc_util.CGSize(view.width, 0))
-    return size.height
+    return text_measure.size(view, view.width, 0)[1]
 
 
 def get_text_width(view):
-    size = view.objc_instance.sizeThatFits_(objc_util.CGSize(0, view.height))
-    return size.width
+    return text_measure.size(view, 0, view.height)[0]
+
+
+transform_cache = TransformCache()
 
 
 def screen(source_value, target, source):
     if not source.superview or not target.superview:
         return (0, 0)
-    return ui.convert_point(
-        ui.convert_point(source_value, source.superview),
-        to_view=target.superview,
-    )
+    return transform_cache.convert_point(
+        source_value, source.superview, target.superview)
 
 
 def screen_x(source_value, target, source):
-    transformed = screen(
-        (source_value, 0),
-        target,
-        source
-    )
-    return transformed[0]
+    if not source.superview or not target.superview:
+        return 0
+    a, b, c, d, tx, ty = transform_cache.get(
+        source.superview, target.superview)
+    return a * source_value + tx
     
 
 def screen_y(source_value, target, source):
-    transformed = screen(
-        (0, source_value),
-        target,
-        source
-    )
-    return transformed[1]
+    if not source.superview or not target.superview:
+        return 0
+    a, b, c, d, tx, ty = transform_cache.get(
+        source.superview, target.superview)
+    return d * source_value + ty
+    
+via_screen = screen
+via_screen_x = screen_x
+via_screen_y = screen_y
     
 source_conversions = (
     screen,
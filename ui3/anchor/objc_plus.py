@@ -17,17 +17,7 @@ class ObjCPlus:
             
             #'TempClass_'+str(uuid.uuid4())[-12:]
             
-            objc_methods = []
-            objc_classmethods = []
-            for key in cls.__dict__:
-                value = getattr(cls, key)
-                if (inspect.isfunction(value) and 
-                    '_self' in inspect.signature(value).parameters
-                ):
-                    if getattr(value, '__self__', None) == cls:
-                        objc_classmethods.append(value)
-                    else:
-                        objc_methods.append(value)
+            objc_methods, objc_classmethods = cls._binding_plan()[:2]
             '''
             objc_methods = [value
                 for value in cls.__dict__.values()
@@ -54,14 +44,47 @@ class ObjCPlus:
         
         instance = objc_class.alloc().init()
 
+        for key, value, bind, init in cls._binding_plan()[2]:
+            if bind:
+                setattr(instance, key, types.MethodType(value, instance))
+            if init:
+                value(instance, *args, **kwargs)
+        return instance
+        
+    @classmethod
+    def _binding_plan(cls):
+        """
+        Inspects the class once and returns a tuple of ObjC methods and class
+        methods to register, and `(key, function, bind, init)` entries to
+        apply to every new instance.
+        """
+        plan = cls.__dict__.get('_objc_binding_plan')
+        if plan is not None:
+            return plan
+            
+        objc_methods = []
+        objc_classmethods = []
+        for key in cls.__dict__:
+            value = getattr(cls, key)
+            if (inspect.isfunction(value) and 
+                '_self' in inspect.signature(value).parameters
+            ):
+                if getattr(value, '__self__', None) == cls:
+                    objc_classmethods.append(value)
+                else:
+                    objc_methods.append(value)
+                    
+        instance_steps = []
         for key in dir(cls):
             value = getattr(cls, key)
             if inspect.isfunction(value):
-                if not '_self' in inspect.signature(value).parameters:
-                    setattr(instance, key, types.MethodType(value, instance))
-                if key == '__init__':
-                    value(instance, *args, **kwargs)
-        return instance
+                bind = not '_self' in inspect.signature(value).parameters
+                init = key == '__init__'
+                instance_steps.append((key, value, bind, init))
+                
+        plan = (objc_methods, objc_classmethods, tuple(instance_steps))
+        cls._objc_binding_plan = plan
+        return plan
         
         
 class ObjCDelegate(ObjCPlus):
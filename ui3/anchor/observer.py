@@ -18,11 +18,16 @@ class NSKeyValueObserving(ObjCDelegate):
             'frame',
             'contentOffset')
     
-    def observe(self, target_view, callback_func):
+    def observe(self, target_view, callback_func, first=False):
         objc_target = target_view.objc_instance
+        callbacks = self.callbacks.setdefault(objc_target, [])
+        if callback_func in callbacks: return
+        if first:
+            callbacks.insert(0, callback_func)
+        else:
+            callbacks.append(callback_func)
         if objc_target in self.targets: return
         self.targets[objc_target] = target_view
-        self.callbacks.setdefault(objc_target, []).append(callback_func)
         for key in self.observeattrs:
             objc_target.layer().addObserver_forKeyPath_options_context_(
                 self, key, 0, None)
@@ -55,7 +60,7 @@ class NSKeyValueObserving(ObjCDelegate):
         try:
             target_view = self.targets.get(objc_target)
             if target_view:
-                for callback in self.callbacks.get(objc_target, []):
+                for callback in list(self.callbacks.get(objc_target, [])):
                     callback(target_view)
         except Exception as e:
             print('observeValueForKeyPath:', self, type(e), e)
@@ -63,12 +68,13 @@ class NSKeyValueObserving(ObjCDelegate):
 
 observer = NSKeyValueObserving()
 
-def on_change(view, func):
+def on_change(view, func, first=False):
     """
     Call func when view frame (position or size) changes.
     Several functions can be registered per view.
+    Set `first` to have func called before the functions already registered.
     """
-    observer.observe(view, func)
+    observer.observe(view, func, first)
     
 def remove_on_change(view, func):
     """
@@ -0,0 +1,129 @@
+import ui
+
+from ui3.cache import LRUCache
+
+from .observer import on_change, remove_on_change
+
+
+class TransformCache:
+    """
+    Caches the affine transform between the coordinate systems of two views.
+
+    A transform is computed once with `ui.convert_point` and then reused for
+    every conversion between the same pair of views, until the frame, bounds
+    or transform of either view or any of their ancestors changes, or either
+    view is moved to another superview.
+
+    Views are only watched, and referenced, while a cached transform
+    involves them.
+    """
+
+    def __init__(self, maxsize=256):
+        self.transforms = LRUCache(maxsize, on_evict=self._evicted)
+        self.keys_by_view = {}
+
+    def get(self, from_view, to_view):
+        """
+        Returns the transform from `from_view` to `to_view` coordinates as an
+        `(a, b, c, d, tx, ty)` tuple. Either view can be `None` for screen
+        coordinates.
+        """
+        key = (from_view, to_view)
+        chains = (self._chain(from_view), self._chain(to_view))
+        entry = self.transforms.get(key)
+        if entry is not None:
+            transform, cached_chains = entry
+            if cached_chains == chains:
+                return transform
+            self.transforms.discard(key)
+            self._unwatch(key, cached_chains)
+        transform = self._compute(from_view, to_view)
+        self.transforms.put(key, (transform, chains))
+        self._watch(key, chains)
+        return transform
+
+    def convert_point(self, point, from_view=None, to_view=None):
+        a, b, c, d, tx, ty = self.get(from_view, to_view)
+        x, y = point
+        return ui.Point(a * x + c * y + tx, b * x + d * y + ty)
+
+    def convert_rect(self, rect, from_view=None, to_view=None):
+        """
+        Converts a rectangle in one call. For rotated or scaled views the
+        result is the bounding box of the converted corners.
+        """
+        a, b, c, d, tx, ty = self.get(from_view, to_view)
+        x, y, w, h = rect
+        xs = []
+        ys = []
+        corners = ((x, y), (x + w, y), (x, y + h), (x + w, y + h))
+        for corner_x, corner_y in corners:
+            xs.append(a * corner_x + c * corner_y + tx)
+            ys.append(b * corner_x + d * corner_y + ty)
+        min_x, min_y = min(xs), min(ys)
+        return ui.Rect(min_x, min_y, max(xs) - min_x, max(ys) - min_y)
+
+    def invalidate(self, view=None):
+        """
+        Drop cached transforms involving the view or its descendants,
+        or all of them if no view is given.
+        """
+        if view is None:
+            self.transforms.clear()
+            for watched in self.keys_by_view:
+                remove_on_change(watched, self.invalidate)
+            self.keys_by_view.clear()
+            return
+        for key in list(self.keys_by_view.get(view, ())):
+            entry = self.transforms.discard(key)
+            if entry is not None:
+                self._unwatch(key, entry[1])
+
+    @staticmethod
+    def _chain(view):
+        chain = []
+        while view is not None:
+            chain.append(view)
+            view = view.superview
+        return tuple(chain)
+
+    def _watch(self, key, chains):
+        for chain in chains:
+            for view in chain:
+                keys = self.keys_by_view.get(view)
+                if keys is None:
+                    keys = self.keys_by_view[view] = set()
+                    on_change(view, self.invalidate, first=True)
+                keys.add(key)
+
+    def _unwatch(self, key, chains):
+        for chain in chains:
+            for view in chain:
+                keys = self.keys_by_view.get(view)
+                if keys is None:
+                    continue
+                keys.discard(key)
+                if not keys:
+                    del self.keys_by_view[view]
+                    remove_on_change(view, self.invalidate)
+
+    def _evicted(self, key, entry):
+        self._unwatch(key, entry[1])
+
+    @staticmethod
+    def _compute(from_view, to_view):
+
+        def convert(point):
+            return ui.convert_point(
+                ui.convert_point(point, from_view),
+                to_view=to_view,
+            )
+
+        origin = convert((0, 0))
+        unit_x = convert((1, 0))
+        unit_y = convert((0, 1))
+        return (
+            unit_x.x - origin.x, unit_x.y - origin.y,
+            unit_y.x - origin.x, unit_y.y - origin.y,
+            origin.x, origin.y,
+        )
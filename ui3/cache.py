@@ -0,0 +1,67 @@
+"""
+Small bounded caches, usable without Pythonista
+"""
+
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Dict-like cache that keeps at most `maxsize` entries, evicting the least
+    recently used one first. Counts hits and misses for `get`.
+
+    The optional `on_evict` function is called with the key and value of
+    every entry evicted to make room.
+    """
+
+    _missing = object()
+
+    def __init__(self, maxsize=256, on_evict=None):
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        value = self._entries.get(key, self._missing)
+        if value is self._missing:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        entries = self._entries
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.maxsize:
+            evicted_key, evicted = entries.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(evicted_key, evicted)
+
+    def discard(self, key):
+        """ Removes the entry if present, and returns its value. """
+        return self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return (
+            f'<{type(self).__name__} {len(self)}/{self.maxsize} '
+            f'hits={self.hits} misses={self.misses}>'
+        )
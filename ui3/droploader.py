@@ -0,0 +1,196 @@
+"""
+Concurrent loading of dropped items
+
+`DropLoader` loads the items of a drop with at most `max_concurrent` loads in
+flight, reports progress, can be cancelled, and delivers the results either
+per item or all together once everything has loaded.
+
+Items are objects with a `load(callback)` method that starts loading, calls
+`callback(result)` when done (from any thread, with `None` on failure), and
+optionally returns an object with a `cancel()` method. In Pythonista,
+`ui3.gestures` wraps `NSItemProvider`s this way. `SimulatedItemProvider` is a
+stand-in that can be used to test and benchmark loading elsewhere:
+
+    items = [SimulatedItemProvider(i, delay=0.1) for i in range(10)]
+    DropLoader(items, on_complete=print, max_concurrent=3).start()
+"""
+
+import threading
+import traceback
+
+
+class DropLoader:
+    """
+    Loads items concurrently and collects the results in item order.
+
+    Callbacks:
+
+      * `on_item(index, result)` - Called as each item finishes loading
+        successfully.
+      * `on_complete(results)` - Called once with the list of successfully
+        loaded results, in item order, unless cancelled.
+      * `on_progress(loader)` - Called after each finished item and on
+        cancellation; see the `loaded`, `total`, `fraction` and `cancelled`
+        attributes.
+
+    Callbacks are called in the thread where the load finished. Exceptions
+    raised by the callbacks are printed, and loading continues.
+
+    Once the loader has finished or is cancelled, it lets go of the items
+    and the results, so that a lingering reference to the loader does not
+    keep the loaded data in memory.
+    """
+
+    def __init__(self, items, on_complete=None, on_item=None,
+                 on_progress=None, max_concurrent=4):
+        self.items = list(items)
+        self.on_complete = on_complete
+        self.on_item = on_item
+        self.on_progress = on_progress
+        self.max_concurrent = max(1, max_concurrent)
+
+        self.total = len(self.items)
+        self.loaded = 0
+        self.cancelled = False
+        self.results = [None] * self.total
+        self.failed = [False] * self.total
+        self.in_flight = {}
+        self.next_index = 0
+        self.starts_due = 0
+        self.starting = False
+        self.lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.loaded == self.total
+
+    @property
+    def fraction(self):
+        return self.loaded / self.total if self.total else 1.0
+
+    def start(self):
+        if not self.total:
+            self._finish()
+            return self
+        with self.lock:
+            self.starts_due += min(self.max_concurrent, self.total)
+        self._start_due()
+        return self
+
+    def cancel(self):
+        """
+        Stops starting new loads, cancels the loads in flight where the items
+        support it, and ignores the results of the rest.
+        """
+        with self.lock:
+            if self.cancelled or self.done:
+                return
+            self.cancelled = True
+            cancellables = list(self.in_flight.values())
+            self._release()
+        for cancellable in cancellables:
+            if cancellable is not None:
+                cancellable.cancel()
+        self._call(self.on_progress, self)
+
+    def _start_due(self):
+        """
+        Starts as many loads as are due. Items that finish synchronously make
+        more starts due; they are picked up by the loop instead of recursing,
+        and by the thread already in the loop if there is one.
+        """
+        with self.lock:
+            if self.starting:
+                return
+            self.starting = True
+        while True:
+            with self.lock:
+                if (self.cancelled or not self.starts_due or
+                        self.next_index >= self.total):
+                    self.starts_due = 0
+                    self.starting = False
+                    return
+                self.starts_due -= 1
+                index = self.next_index
+                self.next_index += 1
+                self.in_flight[index] = None
+            callback = lambda result, index=index: self._loaded(index, result)
+            try:
+                cancellable = self.items[index].load(callback)
+            except Exception:
+                traceback.print_exc()
+                self._loaded(index, None)
+                continue
+            with self.lock:
+                if index in self.in_flight:
+                    self.in_flight[index] = cancellable
+
+    def _loaded(self, index, result):
+        with self.lock:
+            if self.cancelled or index not in self.in_flight:
+                return
+            del self.in_flight[index]
+            self.results[index] = result
+            self.failed[index] = result is None
+            self.loaded += 1
+            finished = self.loaded == self.total
+            if not finished:
+                self.starts_due += 1
+        if result is not None:
+            self._call(self.on_item, index, result)
+        self._call(self.on_progress, self)
+        if finished:
+            self._finish()
+        else:
+            self._start_due()
+
+    def _finish(self):
+        with self.lock:
+            results = [
+                result for result, failed in zip(self.results, self.failed)
+                if not failed
+            ]
+            self._release()
+        self._call(self.on_complete, results)
+
+    def _release(self):
+        self.items = []
+        self.results = []
+        self.failed = []
+        self.in_flight.clear()
+
+    @staticmethod
+    def _call(callback, *args):
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception:
+            traceback.print_exc()
+
+
+class SimulatedItemProvider:
+    """
+    Headless item that produces `value` after `delay` seconds in a timer
+    thread, or `None` if `fail` is set.
+    """
+
+    def __init__(self, value, delay=0.0, fail=False):
+        self.value = value
+        self.delay = delay
+        self.fail = fail
+        self.cancelled = False
+        self.timer = None
+
+    def load(self, callback):
+        self.timer = threading.Timer(
+            self.delay,
+            lambda: callback(None if self.fail else self.value))
+        self.timer.daemon = True
+        self.timer.start()
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+        if self.timer is not None:
+            self.timer.cancel()
@@ -0,0 +1,347 @@
+"""
+Recording and headless replay of gesture event streams
+
+Gestures registered through `ui3.gestures` can be recorded on the device with
+`gestures.start_recording(path)`. The recorded file can then be replayed to
+handlers anywhere, including on a machine without Pythonista, to test and
+benchmark handler code:
+
+    from ui3.gesturereplay import GestureReplayer, read_events
+
+    replayer = GestureReplayer(read_events('pan.gestures'))
+    report = replayer.replay(my_pan_handler)
+    print(report)
+
+Replayed handlers receive `GestureEvent` objects that have the same
+attributes as the live gesture data, except that `recognizer` and `view` are
+not available, and points are plain `(x, y)` named tuples.
+
+File format: a header, followed by stream definitions and events. A stream
+is one recognizer, and its definition tells the gesture kind and the view
+name. Events store the timestamp relative to the start of the recording, the
+state, the number of touches, the location and whichever of translation,
+velocity, scale and rotation the gesture has.
+"""
+
+import collections
+import math
+import struct
+import time
+
+MAGIC = b'UI3G'
+VERSION = 1
+
+STREAM = b'S'
+EVENT = b'E'
+
+# Recognizer states, same as in ui3.gestures
+
+POSSIBLE = 0
+BEGAN = 1
+CHANGED = 2
+ENDED = 3
+CANCELLED = 4
+FAILED = 5
+
+# Flags for the optional values of an event
+
+_TRANSLATION = 1
+_VELOCITY_POINT = 2
+_VELOCITY = 4
+_SCALE = 8
+_ROTATION = 16
+
+_stream_format = struct.Struct('<HHH')
+_event_format = struct.Struct('<HdBBBff')
+_point_format = struct.Struct('<ff')
+_float_format = struct.Struct('<f')
+
+
+Point = collections.namedtuple('Point', 'x y')
+
+
+class GestureEvent:
+    """
+    Replayed gesture event, with the same attributes as the gesture data
+    passed to live handlers.
+    """
+
+    __slots__ = (
+        'stream', 'kind', 'view_name', 'timestamp', 'state',
+        'number_of_touches', 'location', 'translation', 'velocity', 'scale',
+        'rotation', 'recognizer', 'view', 'coalesced',
+    )
+
+    def __init__(self, **kwargs):
+        self.recognizer = self.view = self.scale = self.rotation = \
+            self.velocity = None
+        self.coalesced = 1
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    def copy(self):
+        other = GestureEvent.__new__(GestureEvent)
+        for key in self.__slots__:
+            try:
+                setattr(other, key, getattr(self, key))
+            except AttributeError:
+                pass
+        return other
+
+    def __repr__(self):
+        values = {
+            key: getattr(self, key)
+            for key in self.__slots__ if hasattr(self, key)
+        }
+        return f'{type(self).__name__}({values})'
+
+    @property
+    def began(self):
+        return self.state == BEGAN
+
+    @property
+    def changed(self):
+        return self.state == CHANGED
+
+    @property
+    def ended(self):
+        return self.state == ENDED
+
+    @property
+    def failed(self):
+        return self.state == FAILED
+
+
+class GestureRecorder:
+    """
+    Writes gesture data into a compact binary file. `record` is called with
+    the gesture data, a key that identifies the recognizer, the gesture kind
+    (e.g. 'pan') and an optional view name.
+    """
+
+    def __init__(self, path, clock=time.perf_counter):
+        self.path = path
+        self.clock = clock
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC + bytes([VERSION]))
+        self.streams = {}
+        self.start = clock()
+        self.count = 0
+
+    def record(self, data, key, kind, view_name=''):
+        stream = self.streams.get(key)
+        if stream is None:
+            stream = self.streams[key] = len(self.streams)
+            kind_bytes = kind.encode()
+            name_bytes = (view_name or '').encode()
+            self.file.write(STREAM + _stream_format.pack(
+                stream, len(kind_bytes), len(name_bytes)))
+            self.file.write(kind_bytes + name_bytes)
+
+        flags = 0
+        extra = b''
+        translation = getattr(data, 'translation', None)
+        if translation is not None:
+            flags |= _TRANSLATION
+            extra += _point_format.pack(*translation)
+        velocity = data.velocity
+        if velocity is not None:
+            try:
+                extra += _point_format.pack(*velocity)
+                flags |= _VELOCITY_POINT
+            except TypeError:
+                extra += _float_format.pack(velocity)
+                flags |= _VELOCITY
+        if data.scale is not None:
+            flags |= _SCALE
+            extra += _float_format.pack(data.scale)
+        if data.rotation is not None:
+            flags |= _ROTATION
+            extra += _float_format.pack(data.rotation)
+
+        x, y = data.location
+        self.file.write(EVENT + _event_format.pack(
+            stream, self.clock() - self.start, data.state,
+            data.number_of_touches, flags, x, y) + extra)
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_events(path):
+    """
+    Generator of the `GestureEvent`s in a recorded file, in recording order.
+    """
+    with open(path, 'rb') as fp:
+        content = fp.read()
+    if content[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not a gesture recording', path)
+    if content[len(MAGIC)] != VERSION:
+        raise ValueError('Unsupported gesture recording version', path)
+
+    streams = {}
+    position = len(MAGIC) + 1
+    while position < len(content):
+        tag = content[position:position + 1]
+        position += 1
+        if tag == STREAM:
+            stream, kind_len, name_len = _stream_format.unpack_from(
+                content, position)
+            position += _stream_format.size
+            kind = content[position:position + kind_len].decode()
+            position += kind_len
+            name = content[position:position + name_len].decode()
+            position += name_len
+            streams[stream] = (kind, name)
+        elif tag == EVENT:
+            (stream, timestamp, state, touches, flags,
+             x, y) = _event_format.unpack_from(content, position)
+            position += _event_format.size
+            kind, name = streams[stream]
+            event = GestureEvent(
+                stream=stream, kind=kind, view_name=name,
+                timestamp=timestamp, state=state,
+                number_of_touches=touches, location=Point(x, y),
+            )
+            if flags & _TRANSLATION:
+                event.translation = Point(
+                    *_point_format.unpack_from(content, position))
+                position += _point_format.size
+            if flags & _VELOCITY_POINT:
+                event.velocity = Point(
+                    *_point_format.unpack_from(content, position))
+                position += _point_format.size
+            if flags & _VELOCITY:
+                event.velocity = _float_format.unpack_from(
+                    content, position)[0]
+                position += _float_format.size
+            if flags & _SCALE:
+                event.scale = _float_format.unpack_from(content, position)[0]
+                position += _float_format.size
+            if flags & _ROTATION:
+                event.rotation = _float_format.unpack_from(
+                    content, position)[0]
+                position += _float_format.size
+            yield event
+        else:
+            raise ValueError('Corrupted gesture recording', path, position)
+
+
+class LatencyReport:
+    """
+    Handler latencies of a replay, in seconds: the time each handler call
+    took.
+
+    For replays at a set speed, `lags` are how late each handler call started
+    compared to when the event was due, which includes sleep inaccuracy and
+    any delay caused by previous slow handler calls.
+    """
+
+    def __init__(self, latencies, elapsed, lags=()):
+        self.latencies = sorted(latencies)
+        self.elapsed = elapsed
+        self.lags = sorted(lags)
+
+    @property
+    def count(self):
+        return len(self.latencies)
+
+    def percentile(self, percent):
+        return self._percentile(self.latencies, percent)
+
+    def lag_percentile(self, percent):
+        return self._percentile(self.lags, percent)
+
+    @staticmethod
+    def _percentile(values, percent):
+        if not values:
+            return 0.0
+        rank = math.ceil(percent / 100 * len(values))
+        return values[max(0, rank - 1)]
+
+    @property
+    def events_per_second(self):
+        return self.count / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        ms = lambda seconds: f'{seconds * 1000:.3f} ms'
+        report = (
+            f'{self.count} events in {self.elapsed:.3f} s '
+            f'({self.events_per_second:,.0f}/s), latency '
+            f'p50 {ms(self.percentile(50))}, '
+            f'p90 {ms(self.percentile(90))}, '
+            f'p99 {ms(self.percentile(99))}, '
+            f'max {ms(self.percentile(100))}'
+        )
+        if self.lags:
+            report += (
+                f'; lag behind schedule '
+                f'p50 {ms(self.lag_percentile(50))}, '
+                f'max {ms(self.lag_percentile(100))}'
+            )
+        return report
+
+
+class GestureReplayer:
+    """
+    Feeds recorded events to handlers. Clock and sleep functions can be
+    replaced, e.g. for tests.
+    """
+
+    def __init__(self, events, clock=time.perf_counter, sleep=time.sleep):
+        self.events = list(events)
+        self.clock = clock
+        self.sleep = sleep
+
+    def replay(self, handler, speed=None):
+        """
+        Calls the handler with each event, and returns a `LatencyReport`.
+
+        `handler` is either a function that gets all events, or a dict that
+        maps gesture kinds (e.g. 'pan') to functions; events of other kinds
+        are skipped.
+
+        `speed` of `None` replays as fast as possible, 1.0 at the original
+        speed, 2.0 twice as fast, and so on.
+        """
+        clock = self.clock
+        latencies = []
+        lags = []
+        start = clock()
+        for event in self.events:
+            func = handler
+            if isinstance(handler, dict):
+                func = handler.get(event.kind)
+                if func is None:
+                    continue
+            if speed:
+                due = start + event.timestamp / speed
+                wait = due - clock()
+                if wait > 0:
+                    self.sleep(wait)
+            event = event.copy()
+            called = clock()
+            func(event)
+            latencies.append(clock() - called)
+            if speed:
+                lags.append(called - due)
+        return LatencyReport(latencies, clock() - start, lags)
+
+
+if __name__ == '__main__':
+
+    import sys
+
+    if len(sys.argv) < 2:
+        print('Usage: python -m ui3.gesturereplay RECORDING [SPEED]')
+        sys.exit(1)
+    speed = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    replayer = GestureReplayer(read_events(sys.argv[1]))
+    print(replayer.replay(lambda event: None, speed=speed))
@@ -23,6 +23,10 @@ with [stash](https://github.com/ywangd/stash).
 
 ## Versions:
 
+* 1.4 - Add `dispatch` and `run_on_main` for slow handlers, `coalesce` and
+  `reuse_data` for high-frequency gestures, gesture recording, routing
+  gestures of many subviews with `GestureRouter`, and file and multi-item
+  drops with progress and cancellation.
 * 1.3 - Add `first` to declare priority for the gesture, and an option to use
   the fine-tuning methods with ObjC gesture recognizers.
 * 1.2 - Add drag and drop support.  
@@ -65,6 +69,35 @@ All of the gesture-adding methods return an object that can be used
 to remove or disable the gesture as needed, see the API. You can also remove
 all gestures from a view with `remove_all_gestures(view)`.
 
+## Slow handlers
+
+Handlers are called in the main thread, and a slow handler makes touch
+tracking stutter. All gesture functions accept a `dispatch` parameter; set it
+to `gestures.WORKER` to have the handler called in a shared pool of worker
+threads instead, or give your own `concurrent.futures.Executor`. Events of one
+recognizer are still handled one at a time and in order. Use `run_on_main` to
+update the UI from the handler:
+    
+    def slow_handler(data):
+        result = expensive_calculation(data.location)
+        run_on_main(setattr, label, 'text', result)
+        
+    tap(view, slow_handler, dispatch=WORKER)
+    
+For continuous gestures, `pan`, `edge_pan`, `pinch` and `rotation` also accept
+a `coalesce` interval in seconds (or `gestures.FRAME`) to merge `CHANGED`
+events that arrive faster than that.
+
+## Recording gestures
+
+Gesture events can be recorded into a file, to be replayed later to the same
+handlers without a device or a finger, e.g. in tests or to measure handler
+latencies. See `ui3.gesturereplay` for replaying.
+
+    recorder = start_recording('pan.gestures')
+    ...
+    stop_recording(recorder)
+
 ## Fine-tuning gesture recognition
 
 By default only one gesture recognizer will be successful.
@@ -171,20 +204,36 @@ phone use:
 * It can be hard to add gestures to ui.ScrollView, ui.TextView and the like,
   because they have complex multi-view structures and gestures already in
   place.  
+* For high-frequency gestures like pan, you can set `reuse_data = True` on
+  the returned object. The handler then gets the same `data` object, refilled
+  on every call; use `data.copy()` if you need to keep a snapshot.
 """
 
-__version__ = '1.3'
+__version__ = '1.4'
 
-import ctypes
+import collections
+import concurrent.futures
 import functools
 import inspect
+import itertools
+import mmap
 import os
 import os.path
+import shutil
+import tempfile
+import threading
+import time
+import traceback
 import types
 
 import ui
 from objc_util import *
 
+from ui3.anchor.observer import on_change, remove_on_change
+from ui3.droploader import DropLoader
+from ui3.gesturereplay import GestureRecorder
+from ui3.spatialindex import SpatialGrid
+
 # Recognizer classes
 
 UITapGestureRecognizer = ObjCClass('UITapGestureRecognizer')
@@ -242,6 +291,14 @@ EDGE_BOTTOM = 4
 EDGE_RIGHT = 8
 EDGE_ALL = 15
 
+# Coalescing interval of one display frame
+
+FRAME = 1 / 60
+
+# Handler dispatch to a shared pool of worker threads
+
+WORKER = 'worker'
+
 
 class Data():
     """
@@ -251,10 +308,27 @@ class Data():
     (docgen-ignore)
     """
     
+    __slots__ = (
+        'recognizer', 'view', 'location', 'state', 'number_of_touches',
+        'scale', 'rotation', 'velocity', 'translation', 'coalesced',
+    )
+    
     def __init__(self):
         self.recognizer = self.view = self.location = self.state = \
             self.number_of_touches = self.scale = self.rotation = \
             self.velocity = None
+        self.coalesced = 1
+            
+    def copy(self):
+        """ Returns a snapshot of this record, e.g. to keep when the gesture
+        reuses its record. """
+        other = Data.__new__(Data)
+        for key in self.__slots__:
+            try:
+                setattr(other, key, getattr(self, key))
+            except AttributeError:
+                pass
+        return other
 
     def __str__(self):
         str_states = (
@@ -267,7 +341,8 @@ class Data():
         )
         result = 'Gesture data object:'
         for key in dir(self):
-            if key.startswith('__'): continue
+            if key.startswith('__') or not hasattr(self, key): continue
+            if callable(getattr(self, key)): continue
             result += '\n'
             if key == 'state':
                 value = f'{str_states[self.state]} ({self.state})'
@@ -281,7 +356,11 @@ class Data():
         return result
 
     def __repr__(self):
-        return f'{type(self)}: {self.__dict__}'
+        values = {
+            key: getattr(self, key)
+            for key in self.__slots__ if hasattr(self, key)
+        }
+        return f'{type(self)}: {values}'
 
     @property
     def began(self):
@@ -300,6 +379,111 @@ class Data():
         return self.state == FAILED
             
             
+class Coalescer:
+    """
+    Wraps a gesture handler so that `CHANGED` events arriving within
+    `interval` seconds of the previous delivery are merged, and only the
+    latest one is delivered when the interval has passed. Translation, scale
+    and rotation of gestures are relative to the start of the gesture, so
+    the latest event already contains the accumulated change; `coalesced`
+    tells how many events it stands for.
+    
+    Other states are delivered immediately, and discard any pending
+    `CHANGED` event. (docgen-ignore)
+    """
+    
+    def __init__(self, handler, interval=FRAME,
+            clock=time.perf_counter, schedule=ui.delay):
+        self.handler = handler
+        self.interval = interval
+        self.clock = clock
+        self.schedule = schedule
+        self.pending = None
+        self.scheduled = False
+        self.last_delivery = None
+        
+    def __call__(self, data):
+        now = self.clock()
+        if data.state != CHANGED:
+            self.pending = None
+            self._deliver(data, now)
+            return
+            
+        if self.pending is not None:
+            merged = self.pending.coalesced + 1
+            self.pending = data.copy()
+            self.pending.coalesced = merged
+            return
+        
+        since_last = (self.interval if self.last_delivery is None
+            else now - self.last_delivery)
+        if since_last >= self.interval:
+            self._deliver(data, now)
+        else:
+            self.pending = data.copy()
+            if not self.scheduled:
+                self.scheduled = True
+                self.schedule(self.flush, self.interval - since_last)
+            
+    def flush(self):
+        self.scheduled = False
+        data, self.pending = self.pending, None
+        if data is not None:
+            self._deliver(data, self.clock())
+            
+    def _deliver(self, data, now):
+        self.last_delivery = now
+        self.handler(data)
+            
+
+class SerialDispatcher:
+    """
+    Wraps a gesture handler so that it is called with snapshots of the
+    gesture data in a worker thread. Events of one recognizer are always
+    handled one at a time and in order, even when the executor has several
+    threads. (docgen-ignore)
+    """
+    
+    def __init__(self, handler, executor):
+        self.handler = handler
+        self.executor = executor
+        self.queue = collections.deque()
+        self.lock = threading.Lock()
+        self.running = False
+        
+    def __call__(self, data):
+        with self.lock:
+            self.queue.append(data.copy())
+            if self.running:
+                return
+            self.running = True
+        self.executor.submit(self._drain)
+        
+    def _drain(self):
+        while True:
+            with self.lock:
+                if not self.queue:
+                    self.running = False
+                    return
+                data = self.queue.popleft()
+            try:
+                self.handler(data)
+            except Exception:
+                traceback.print_exc()
+                
+
+_worker_pool = None
+
+def _executor_for(dispatch):
+    global _worker_pool
+    if dispatch != WORKER:
+        return dispatch
+    if _worker_pool is None:
+        _worker_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix='gestures')
+    return _worker_pool
+    
+
 class ObjCPlus:
     """ docgen-ignore """
     
@@ -313,17 +497,7 @@ class ObjCPlus:
             
             #'TempClass_'+str(uuid.uuid4())[-12:]
             
-            objc_methods = []
-            objc_classmethods = []
-            for key in cls.__dict__:
-                value = getattr(cls, key)
-                if (inspect.isfunction(value) and 
-                    '_self' in inspect.signature(value).parameters
-                ):
-                    if getattr(value, '__self__', None) == cls:
-                        objc_classmethods.append(value)
-                    else:
-                        objc_methods.append(value)
+            objc_methods, objc_classmethods = cls._binding_plan()[:2]
             if ObjCDelegate in cls.__mro__:
                 objc_protocols = cls.__name__
             else:
@@ -341,16 +515,48 @@ class ObjCPlus:
         
         instance = objc_class.alloc().init()
 
+        for key, value, bind, init in cls._binding_plan()[2]:
+            if bind:
+                setattr(instance, key, types.MethodType(value, instance))
+            if init:
+                value(instance, *args, **kwargs)
+
+        return instance
+
+    @classmethod
+    def _binding_plan(cls):
+        """ Inspects the class once and returns a tuple of ObjC methods and
+        class methods to register, and `(key, function, bind, init)` entries
+        to apply to every new instance. """
+        plan = cls.__dict__.get('_objc_binding_plan')
+        if plan is not None:
+            return plan
+
+        objc_methods = []
+        objc_classmethods = []
+        for key in cls.__dict__:
+            value = getattr(cls, key)
+            if (inspect.isfunction(value) and 
+                '_self' in inspect.signature(value).parameters
+            ):
+                if getattr(value, '__self__', None) == cls:
+                    objc_classmethods.append(value)
+                else:
+                    objc_methods.append(value)
+
+        instance_steps = []
         for key in dir(cls):
             value = getattr(cls, key)
             if inspect.isfunction(value):
-                if (not key.startswith('__') and 
-                not '_self' in inspect.signature(value).parameters):
-                    setattr(instance, key, types.MethodType(value, instance))
-                if key == '__init__':
-                    value(instance, *args, **kwargs)
+                bind = (not key.startswith('__') and 
+                    not '_self' in inspect.signature(value).parameters)
+                init = key == '__init__'
+                if bind or init:
+                    instance_steps.append((key, value, bind, init))
 
-        return instance
+        plan = (objc_methods, objc_classmethods, tuple(instance_steps))
+        cls._objc_binding_plan = plan
+        return plan
 
         
 class ObjCDelegate(ObjCPlus):
@@ -360,14 +566,100 @@ class ObjCDelegate(ObjCPlus):
             
 def _is_objc_type(objc_instance, objc_class):
     return objc_instance.isKindOfClass_(objc_class.ptr)
+    
+    
+def _pan_extractor(recognizer, objc_view):
+    translation_in_view = recognizer.translationInView_
+    velocity_in_view = recognizer.velocityInView_
+    def extract(data):
+        trans = translation_in_view(objc_view)
+        vel = velocity_in_view(objc_view)
+        data.translation = ui.Point(trans.x, trans.y)
+        data.velocity = ui.Point(vel.x, vel.y)
+    return extract
+    
+def _pinch_extractor(recognizer, objc_view):
+    scale = recognizer.scale
+    velocity = recognizer.velocity
+    def extract(data):
+        data.scale = scale()
+        data.velocity = velocity()
+    return extract
+    
+def _rotation_extractor(recognizer, objc_view):
+    rotation = recognizer.rotation
+    velocity = recognizer.velocity
+    def extract(data):
+        data.rotation = rotation()
+        data.velocity = velocity()
+    return extract
+    
+_extractors = (
+    (UIPanGestureRecognizer, _pan_extractor),
+    (UIScreenEdgePanGestureRecognizer, _pan_extractor),
+    (UIPinchGestureRecognizer, _pinch_extractor),
+    (UIRotationGestureRecognizer, _rotation_extractor),
+)
+
+_kinds = (
+    (UITapGestureRecognizer, 'tap'),
+    (UILongPressGestureRecognizer, 'long_press'),
+    (UIScreenEdgePanGestureRecognizer, 'edge_pan'),
+    (UIPanGestureRecognizer, 'pan'),
+    (UIPinchGestureRecognizer, 'pinch'),
+    (UIRotationGestureRecognizer, 'rotation'),
+    (UISwipeGestureRecognizer, 'swipe'),
+)
+
+def _gesture_kind(recognizer):
+    for recognizer_class, kind in _kinds:
+        if _is_objc_type(recognizer, recognizer_class):
+            return kind
+    return 'gesture'
+
+def _data_filler(recognizer, view):
+    """ Resolves the recognizer type once, and returns a function that
+    fills a `Data` record with the current state of the gesture. """
+    objc_view = hasattr(view, 'objc_instance') and view.objc_instance or view
+    location_in_view = recognizer.locationInView_
+    state = recognizer.state
+    number_of_touches = recognizer.numberOfTouches
+    
+    extract = None
+    for recognizer_class, extractor in _extractors:
+        if _is_objc_type(recognizer, recognizer_class):
+            extract = extractor(recognizer, objc_view)
+            break
+    
+    def fill(data):
+        data.recognizer = recognizer
+        data.view = view
+        location = location_in_view(objc_view)
+        data.location = ui.Point(location.x, location.y)
+        data.state = state()
+        data.number_of_touches = number_of_touches()
+        if extract is not None:
+            extract(data)
+        return data
+        
+    return fill
 
 class UIGestureRecognizerDelegate(ObjCDelegate):
     """ docgen-ignore """
     
-    def __init__(self, recognizer_class, view, handler_func):
+    def __init__(self, recognizer_class, view, handler_func,
+            coalesce=None, dispatch=None):
         self.view = view
         self.handler_func = handler_func
         self.other_recognizers = []
+        self.reuse_data = False
+        
+        self.deliver = handler_func
+        if dispatch:
+            self.deliver = SerialDispatcher(
+                self.deliver, _executor_for(dispatch))
+        if coalesce:
+            self.deliver = Coalescer(self.deliver, coalesce)
         
         view.touch_enabled = True
 
@@ -380,37 +672,22 @@ class UIGestureRecognizerDelegate(ObjCDelegate):
             if hasattr(view, 'objc_instance'):
                 view = view.objc_instance
             view.addGestureRecognizer_(self.recognizer)
+            
+            self.fill_data = _data_filler(self.recognizer, self.view)
+            self.reusable_data = Data()
+            self.kind = _gesture_kind(self.recognizer)
 
         retain_global(self)
     
     def gestureAction(_self, _cmd):
         self = ObjCInstance(_self)
-        view = self.view
-        objc_view = hasattr(view, 'objc_instance') and view.objc_instance or view
-        recognizer = self.recognizer
-        handler_func = self.handler_func
-        data = Data()
-        data.recognizer = recognizer
-        data.view = view
-        location = recognizer.locationInView_(objc_view)
-        data.location = ui.Point(location.x, location.y)
-        data.state = recognizer.state()
-        data.number_of_touches = recognizer.numberOfTouches()
-        
-        if (_is_objc_type(recognizer, UIPanGestureRecognizer) or 
-        _is_objc_type(recognizer, UIScreenEdgePanGestureRecognizer)):
-            trans = recognizer.translationInView_(objc_view)
-            vel = recognizer.velocityInView_(objc_view)
-            data.translation = ui.Point(trans.x, trans.y)
-            data.velocity = ui.Point(vel.x, vel.y)
-        elif _is_objc_type(recognizer, UIPinchGestureRecognizer):
-            data.scale = recognizer.scale()
-            data.velocity = recognizer.velocity()
-        elif _is_objc_type(recognizer, UIRotationGestureRecognizer):
-            data.rotation = recognizer.rotation()
-            data.velocity = recognizer.velocity()
-    
-        handler_func(data)
+        data = self.reusable_data if self.reuse_data else Data()
+        self.fill_data(data)
+        if _recorders:
+            for recorder in _recorders:
+                recorder.record(data, self.recognizer.ptr, self.kind,
+                    getattr(self.view, 'name', None))
+        self.deliver(data)
         
     def gestureRecognizer_shouldRecognizeSimultaneouslyWithGestureRecognizer_(
             _self, _sel, _gr, _other_gr):
@@ -456,7 +733,8 @@ class UIGestureRecognizerDelegate(ObjCDelegate):
 
 @on_main_thread
 def tap(view, action, 
-        number_of_taps_required=None, number_of_touches_required=None):
+        number_of_taps_required=None, number_of_touches_required=None,
+        dispatch=None):
     """ Call `action` when a tap gesture is recognized for the `view`.
 
     Additional parameters:
@@ -465,8 +743,11 @@ def tap(view, action,
       the gesture to be recognized.
     * `number_of_touches_required` - Set if more than one finger is
       required for the gesture to be recognized.
+    * `dispatch` - Set to `gestures.WORKER` to call `action` in a worker
+      thread, see Usage.
     """
-    handler = UIGestureRecognizerDelegate(UITapGestureRecognizer, view, action)
+    handler = UIGestureRecognizerDelegate(UITapGestureRecognizer, view, action,
+        dispatch=dispatch)
 
     recognizer = handler.recognizer
     if number_of_taps_required:
@@ -479,19 +760,21 @@ def tap(view, action,
 
 @on_main_thread
 def doubletap(view, action, 
-        number_of_touches_required=None):
+        number_of_touches_required=None, dispatch=None):
     """ Convenience method that calls `tap` with a 2-tap requirement.
     """
     return tap(view, action,
         number_of_taps_required=2,
-        number_of_touches_required=number_of_touches_required)
+        number_of_touches_required=number_of_touches_required,
+        dispatch=dispatch)
 
 @on_main_thread
 def long_press(view, action,
         number_of_taps_required=None,
         number_of_touches_required=None,
         minimum_press_duration=None,
-        allowable_movement=None):
+        allowable_movement=None,
+        dispatch=None):
     """ Call `action` when a long press gesture is recognized for the
     `view`. Note that this is a continuous gesture; you might want to
     check for `data.changed` or `data.ended` to get the desired results.
@@ -506,8 +789,11 @@ def long_press(view, action,
       recognition treshold.
     * `allowable_movement` - Set to change the default 10 point maximum
     distance allowed for the gesture to be recognized.
+    * `dispatch` - Set to `gestures.WORKER` to call `action` in a worker
+      thread, see Usage.
     """
-    handler = UIGestureRecognizerDelegate(UILongPressGestureRecognizer, view, action)
+    handler = UIGestureRecognizerDelegate(UILongPressGestureRecognizer, view, action,
+        dispatch=dispatch)
 
     recognizer = handler.recognizer
     if number_of_taps_required:
@@ -524,7 +810,9 @@ def long_press(view, action,
 @on_main_thread
 def pan(view, action,
         minimum_number_of_touches=None,
-        maximum_number_of_touches=None):
+        maximum_number_of_touches=None,
+        coalesce=None,
+        dispatch=None):
     """ Call `action` when a pan gesture is recognized for the `view`.
     This is a continuous gesture.
 
@@ -532,6 +820,11 @@ def pan(view, action,
 
     * `minimum_number_of_touches` - Set to control the gesture recognition.
     * `maximum_number_of_touches` - Set to control the gesture recognition.
+    * `coalesce` - Set to a number of seconds, or `gestures.FRAME`, to
+      deliver at most one `CHANGED` event per interval to a slow handler,
+      see below.
+    * `dispatch` - Set to `gestures.WORKER` to call `action` in a worker
+      thread, see Usage.
 
     Handler `action` receives the following gesture-specific attributes
     in the `data` argument:
@@ -540,8 +833,13 @@ def pan(view, action,
       as a `ui.Point` with `x` and `y` attributes.
     * `velocity` - Current velocity of the pan gesture as points per
       second (a `ui.Point` with `x` and `y` attributes).
+    * `coalesced` - Number of `CHANGED` events merged into this one when
+      `coalesce` is set. Translation is always relative to the start of the
+      gesture, so merged events only skip intermediate states. `BEGAN` and
+      `ENDED` events are never delayed.
     """
-    handler = UIGestureRecognizerDelegate(UIPanGestureRecognizer, view, action)
+    handler = UIGestureRecognizerDelegate(UIPanGestureRecognizer, view, action,
+        coalesce, dispatch)
 
     recognizer = handler.recognizer
     if minimum_number_of_touches:
@@ -552,7 +850,7 @@ def pan(view, action,
     return handler
 
 @on_main_thread
-def edge_pan(view, action, edges):
+def edge_pan(view, action, edges, coalesce=None, dispatch=None):
     """ Call `action` when a pan gesture starting from the edge is
     recognized for the `view`. This is a continuous gesture.
 
@@ -563,16 +861,18 @@ def edge_pan(view, action, edges):
     method.
 
     Handler `action` receives the same gesture-specific attributes in
-    the `data` argument as pan gestures, see `pan`.
+    the `data` argument as pan gestures, and supports the same `coalesce`
+    and `dispatch` parameters, see `pan`.
     """
-    handler = UIGestureRecognizerDelegate(UIScreenEdgePanGestureRecognizer, view, action)
+    handler = UIGestureRecognizerDelegate(UIScreenEdgePanGestureRecognizer, view, action,
+        coalesce, dispatch)
 
     handler.recognizer.edges = edges
 
     return handler
 
 @on_main_thread
-def pinch(view, action):
+def pinch(view, action, coalesce=None, dispatch=None):
     """ Call `action` when a pinch gesture is recognized for the `view`.
     This is a continuous gesture.
 
@@ -583,13 +883,17 @@ def pinch(view, action):
       the touch first started.
     * `velocity` - Current velocity of the pinch gesture as scale
       per second.
+      
+    Set `coalesce` to limit the rate of `CHANGED` events, and `dispatch`
+    to handle events in a worker thread, see `pan`.
     """
-    handler = UIGestureRecognizerDelegate(UIPinchGestureRecognizer, view, action)
+    handler = UIGestureRecognizerDelegate(UIPinchGestureRecognizer, view, action,
+        coalesce, dispatch)
 
     return handler
 
 @on_main_thread
-def rotation(view, action):
+def rotation(view, action, coalesce=None, dispatch=None):
     """ Call `action` when a rotation gesture is recognized for the `view`.
     This is a continuous gesture.
 
@@ -600,8 +904,12 @@ def rotation(view, action):
       fingers when the touch first started.
     * `velocity` - Current velocity of the rotation gesture as radians
       per second.
+      
+    Set `coalesce` to limit the rate of `CHANGED` events, and `dispatch`
+    to handle events in a worker thread, see `pan`.
     """
-    handler = UIGestureRecognizerDelegate(UIRotationGestureRecognizer, view, action)
+    handler = UIGestureRecognizerDelegate(UIRotationGestureRecognizer, view, action,
+        coalesce, dispatch)
 
     return handler
 
@@ -610,7 +918,8 @@ def swipe(view, action,
         direction=None,
         number_of_touches_required=None,
         min_distance=None,
-        max_distance=None):
+        max_distance=None,
+        dispatch=None):
     """ Call `action` when a swipe gesture is recognized for the `view`.
 
     Additional parameters:
@@ -625,13 +934,16 @@ def swipe(view, action,
     * `max_distance` - Maximum distance the swipe gesture can travel in
       order to still be recognized. Default is a very large number.
       This uses an undocumented recognizer attribute.
+    * `dispatch` - Set to `gestures.WORKER` to call `action` in a worker
+      thread, see Usage.
 
     If set to recognize swipes to multiple directions, the handler
     does not receive any indication of the direction of the swipe. Add
     multiple recognizers if you need to differentiate between the
     directions.
     """
-    handler = UIGestureRecognizerDelegate(UISwipeGestureRecognizer, view, action)
+    handler = UIGestureRecognizerDelegate(UISwipeGestureRecognizer, view, action,
+        dispatch=dispatch)
 
     recognizer = handler.recognizer
     if direction:
@@ -651,6 +963,160 @@ def swipe(view, action,
     return handler
 
 
+def run_on_main(func, *args, wait=False, **kwargs):
+    """ Calls `func` with the given arguments in the main thread. Use this to
+    update the UI from a handler running in a worker thread.
+    
+    By default, returns immediately without waiting for `func` to run. Set
+    `wait` to wait, and to get the return value of `func`. """
+    if wait:
+        return on_main_thread(func)(*args, **kwargs)
+    ui.delay(functools.partial(func, *args, **kwargs), 0)
+
+
+#docgen: Routing
+
+class GestureRouter:
+    """ Routes the gestures of many subviews through one recognizer per
+    gesture type, installed on the `container` view. Use this instead of the
+    plain gesture functions when there are hundreds of tappable tiles:
+        
+        router = GestureRouter(container)
+        for tile in tiles:
+            router.tap(tile, tile_tapped)
+            
+    Handlers get the same `data` as with the plain gesture functions, except
+    that `data.view` is the subview that was hit, and `data.location` is in
+    the coordinates of that subview. Continuous gestures stay with the
+    subview where they began.
+    
+    The subviews are found with a grid index of their frames in `container`
+    coordinates, kept up to date as the frames of the subviews, or of their
+    ancestors below `container`, change. Add subviews to the view hierarchy
+    before registering them. Where subviews overlap, the one registered last
+    wins. Hidden subviews are skipped.
+    """
+    
+    def __init__(self, container, cell_size=64):
+        self.container = container
+        self.grid = SpatialGrid(cell_size)
+        self.routes = {}
+        self.delegates = {}
+        self.active = {}
+        self.watched = {}
+        
+    def add(self, gesture, view, action, **kwargs):
+        """ Register `action` to be called when the `gesture` function
+        (e.g. `tap`) is recognized on `view`. Keyword arguments are passed to
+        the gesture function; a recognizer is created for each distinct
+        combination of gesture and arguments.
+        
+        Returns the delegate of the shared recognizer. """
+        key = (gesture, tuple(sorted(kwargs.items())))
+        handlers = self.routes.get(key)
+        if handlers is None:
+            handlers = self.routes[key] = {}
+            self.delegates[key] = gesture(self.container,
+                functools.partial(self._dispatch, key), **kwargs)
+        handlers[view] = action
+        if view not in self.grid:
+            self._track(view)
+        return self.delegates[key]
+        
+    def tap(self, view, action, **kwargs):
+        """ Same as `add(tap, view, action, **kwargs)`. """
+        return self.add(tap, view, action, **kwargs)
+        
+    def doubletap(self, view, action, **kwargs):
+        """ Same as `add(doubletap, view, action, **kwargs)`. """
+        return self.add(doubletap, view, action, **kwargs)
+        
+    def long_press(self, view, action, **kwargs):
+        """ Same as `add(long_press, view, action, **kwargs)`. """
+        return self.add(long_press, view, action, **kwargs)
+        
+    def pan(self, view, action, **kwargs):
+        """ Same as `add(pan, view, action, **kwargs)`. """
+        return self.add(pan, view, action, **kwargs)
+        
+    def swipe(self, view, action, **kwargs):
+        """ Same as `add(swipe, view, action, **kwargs)`. """
+        return self.add(swipe, view, action, **kwargs)
+        
+    def remove(self, view):
+        """ Remove all gestures of the `view`. """
+        for handlers in self.routes.values():
+            handlers.pop(view, None)
+        self.grid.remove(view)
+        for ancestor, views in list(self.watched.items()):
+            views.discard(view)
+            if not views:
+                del self.watched[ancestor]
+                remove_on_change(ancestor, self._changed)
+                
+    def hit(self, x, y, key=None):
+        """ Returns the topmost visible registered subview at the point in
+        `container` coordinates, or `None`. """
+        handlers = self.routes.get(key)
+        return self.grid.topmost(x, y, lambda view:
+            not view.hidden and (handlers is None or view in handlers))
+        
+    def _dispatch(self, key, data):
+        state = data.state
+        if key in self.active and state != BEGAN:
+            view = self.active[key]
+            if state in (ENDED, CANCELLED, FAILED):
+                del self.active[key]
+        else:
+            view = self.hit(*data.location, key=key)
+            if state == BEGAN:
+                self.active[key] = view
+        if view is None:
+            return
+        action = self.routes[key].get(view)
+        if action is None:
+            return
+        x, y, _, _ = self.grid.rect(view)
+        data.view = view
+        data.location = ui.Point(data.location.x - x, data.location.y - y)
+        action(data)
+        
+    def _rect(self, view):
+        return ui.convert_rect(view.frame, view.superview, self.container)
+        
+    def _track(self, view):
+        self.grid.insert(view, self._rect(view))
+        ancestor = view
+        while ancestor is not None and ancestor is not self.container:
+            views = self.watched.get(ancestor)
+            if views is None:
+                views = self.watched[ancestor] = set()
+                on_change(ancestor, self._changed)
+            views.add(view)
+            ancestor = ancestor.superview
+            
+    def _changed(self, ancestor):
+        for view in self.watched.get(ancestor, ()):
+            self.grid.update(view, self._rect(view))
+
+
+#docgen: Recording
+
+_recorders = []
+
+def start_recording(path):
+    """ Start recording the events of all gestures into a file at `path`.
+    Returns a `GestureRecorder` to be given to `stop_recording`. """
+    recorder = GestureRecorder(path)
+    _recorders.append(recorder)
+    return recorder
+
+def stop_recording(recorder):
+    """ Stop recording and close the file. """
+    _recorders.remove(recorder)
+    recorder.close()
+
+
 #docgen: Gesture management
 
 @on_main_thread
@@ -705,38 +1171,257 @@ def replace_close_gesture(view, recognizer_class):
 # Drag and drop delegates and helpers
 
 class File:
-    """ docgen-ignore """
+    """ File payload for drag and drop, passed around as a path.
+    
+    Use `chunks()` (or iterate over the object) to process the contents
+    piece by piece, or `mmap()` for random access without reading the whole
+    file into memory. `data` reads everything at once, and is best kept for
+    small files.
+    
+    Dropped files are temporary copies that are deleted when the drop
+    handler returns; call `keep()` in the handler to keep the copy until you
+    `delete()` it yourself. (docgen-ignore) """
     
     UTI = 'kUTTypeData'
+    CHUNK_SIZE = 64 * 1024
     
-    def __init__(self, path, mode='r', data=None):
+    def __init__(self, path, mode='r', data=None, temporary=False):
         self.path = path
         self.filename = os.path.basename(path)
         self.mode = mode
         self._data = data
+        self.temporary = temporary
+        
+    def keep(self):
+        """ Keeps a dropped file after the drop handler returns. """
+        self.temporary = False
+        
+    def delete(self):
+        """ Deletes the file, and the directory of a dropped copy. """
+        directory = os.path.dirname(self.path)
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        if os.path.dirname(directory) == _drop_directory:
+            shutil.rmtree(directory, ignore_errors=True)
+        self.temporary = False
+        
+    def __repr__(self):
+        return f'File({self.path!r})'
     
     @property    
     def data(self):
         if self._data is None:
-            with open(self.filename, self.mode) as fp:
+            with open(self.path, self.mode) as fp:
                 self._data = fp.read()
         return self._data
         
-drag_and_drop_prefix = 'py_object_'
+    @property
+    def size(self):
+        return os.path.getsize(self.path)
+        
+    def open(self):
+        """ Returns the file opened for binary reading. """
+        return open(self.path, 'rb')
+        
+    def chunks(self, size=CHUNK_SIZE):
+        """ Generator of the contents as `bytes` chunks of up to `size`
+        bytes. """
+        with self.open() as fp:
+            while True:
+                chunk = fp.read(size)
+                if not chunk:
+                    return
+                yield chunk
+                
+    def __iter__(self):
+        return self.chunks()
+        
+    def mmap(self):
+        """ Returns a read-only `mmap.mmap` of the file. The map can be
+        used as a context manager, and stays valid after the file is closed.
+        Empty files cannot be mapped and raise `ValueError`. """
+        with self.open() as fp:
+            return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            
 
-def _to_pyobject(item):
-    item = ObjCInstance(item)
+# Copies of dropped files, left over copies are removed at import
+_drop_directory = os.path.join(tempfile.gettempdir(), 'ui3-drops')
+shutil.rmtree(_drop_directory, ignore_errors=True)
+
+def _copy_dropped_file(url):
+    """ Dropped files are only available for the duration of the load
+    completion handler, so they are copied into a directory of their own
+    in the drop directory. """
+    source = str(url.path())
+    os.makedirs(_drop_directory, exist_ok=True)
+    directory = tempfile.mkdtemp(prefix='drop-', dir=_drop_directory)
+    destination = os.path.join(directory, os.path.basename(source))
+    shutil.copyfile(source, destination)
+    return destination
+    
+def _dropped_payload(_object):
+    if not _object:
+        return None
+    obj = ObjCInstance(_object)
+    if _is_objc_type(obj, NSString):
+        return str(obj)
+    elif _is_objc_type(obj, UIImage):
+        return ui.Image.from_data(uiimage_to_png(obj))
+    elif _is_objc_type(obj, NSURL):
+        return File(_copy_dropped_file(obj), mode='rb', temporary=True)
+    return None
+    
+    
+class _ProviderItem:
+    """ Adapts an `NSItemProvider` to the `DropLoader` item interface.
+    
+    The completion block is retained until it has run. Cancelling drops the
+    reference to the loader callback right away, so the block does not keep
+    the loader and its payloads alive while iOS finishes the load.
+    (docgen-ignore) """
+    
+    def __init__(self, provider, accept_type):
+        self.provider = provider
+        self.accept_type = accept_type
+        self.block = None
+        self.callback = None
+        self.progress = None
+        
+    def load(self, callback):
+        provider = self.provider
+        self.callback = callback
+        
+        def completion_handler(_cmd, _object, _error):
+            callback, self.callback = self.callback, None
+            try:
+                if callback is not None:
+                    callback(_dropped_payload(_object))
+            finally:
+                self._release_block()
+            
+        self.block = ObjCBlock(
+            completion_handler, restype=None,
+            argtypes=[c_void_p, c_void_p, c_void_p])
+        retain_global(self.block)
+            
+        if provider.canLoadObjectOfClass(self.accept_type):
+            self.progress = provider.loadObjectOfClass_completionHandler_(
+                self.accept_type, self.block)
+            return self
+        if self.accept_type is NSData:
+            type_identifiers = provider.registeredTypeIdentifiers()
+            if type_identifiers:
+                self.progress = provider.loadFileRepresentationForTypeIdentifier_completionHandler_(
+                    type_identifiers[0], self.block)
+                return self
+        self.callback = None
+        release_global(self.block)
+        self.block = None
+        callback(None)
+        
+    def cancel(self):
+        self.callback = None
+        if self.progress is not None:
+            self.progress.cancel()
+            
+    def _release_block(self):
+        # Released from the main thread, after the block has returned
+        block, self.block = self.block, None
+        if block is not None:
+            run_on_main(release_global, block)
+        
+        
+def _deliver_drop(handler, data, receiver):
+    """ Calls the drop handler, then deletes the dropped temporary files
+    that the handler did not keep. """
     try:
-        data = item.localObject()
-        if data is None: return None
-        if not str(data).startswith(drag_and_drop_prefix):
+        handler(data, None, receiver)
+    finally:
+        for payload in data if isinstance(data, list) else [data]:
+            if isinstance(payload, File) and payload.temporary:
+                payload.delete()
+
+        
+drag_and_drop_prefix = 'py_object_'
+
+
+class PayloadRegistry:
+    """ Keeps in-app drag and drop payloads behind opaque handles, so that
+    only the handle string travels in the drag item.
+    
+    Entries are released when their drag session ends. As a safety net for
+    sessions that never report ending, entries also expire after `ttl`
+    seconds, and at most `maxsize` entries are kept, dropping the oldest
+    first. (docgen-ignore) """
+    
+    def __init__(self, maxsize=64, ttl=600, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = collections.OrderedDict()
+        self.handles_by_session = {}
+        self.counter = itertools.count(1)
+        
+    def __len__(self):
+        return len(self.entries)
+        
+    def register(self, content, session=None):
+        """ Returns a new handle for `content`, tied to the `session` key
+        if given. """
+        self._expire()
+        while len(self.entries) >= self.maxsize:
+            self.release(next(iter(self.entries)))
+        handle = f'{drag_and_drop_prefix}{next(self.counter)}'
+        self.entries[handle] = (self.clock() + self.ttl, content, session)
+        if session is not None:
+            self.handles_by_session.setdefault(session, []).append(handle)
+        return handle
+        
+    def get(self, handle):
+        """ Returns the content for the handle, or `None` if the handle is
+        unknown or has expired. """
+        entry = self.entries.get(handle)
+        if entry is None:
             return None
-        address_str = str(data)[len(drag_and_drop_prefix):]
-        address = int(address_str)
-        result = ctypes.cast(address, ctypes.py_object).value
-        return result
-    except Exception as e:
+        expires, content, session = entry
+        if expires <= self.clock():
+            self.release(handle)
+            return None
+        return content
+        
+    def release(self, handle):
+        entry = self.entries.pop(handle, None)
+        if entry is None or entry[2] is None:
+            return
+        session = entry[2]
+        handles = self.handles_by_session.get(session)
+        if handles is not None:
+            handles.remove(handle)
+            if not handles:
+                del self.handles_by_session[session]
+        
+    def release_session(self, session):
+        for handle in self.handles_by_session.pop(session, ()):
+            self.entries.pop(handle, None)
+            
+    def _expire(self):
+        now = self.clock()
+        entries = self.entries
+        while entries:
+            handle, (expires, content, session) = next(iter(entries.items()))
+            if expires > now:
+                break
+            self.release(handle)
+
+_payloads = PayloadRegistry()
+
+def _to_pyobject(item):
+    handle = ObjCInstance(item).localObject()
+    if handle is None:
         return None
+    return _payloads.get(str(handle))
 
 
 class UIDragInteractionDelegate(ObjCDelegate):
@@ -767,6 +1452,7 @@ class UIDragInteractionDelegate(ObjCDelegate):
         
         external_payload = ''
         suggested_name = None
+        provider = None
         
         if type(payload) is str:
             external_payload = payload
@@ -777,29 +1463,41 @@ class UIDragInteractionDelegate(ObjCDelegate):
             except: pass
         elif type(payload) is File:
             suggested_name = payload.filename
+            # File representation, loaded from disk by the receiver
+            provider = NSItemProvider.alloc().initWithContentsOfURL_(
+                nsurl(os.path.abspath(payload.path)))
             
-        provider = NSItemProvider.alloc().initWithObject(external_payload)
+        if provider is None:
+            provider = NSItemProvider.alloc().initWithObject(external_payload)
         if suggested_name:
             provider.setSuggestedName_(suggested_name)
         item = UIDragItem.alloc().initWithItemProvider(provider)
         item.setLocalObject_(
-            str(drag_and_drop_prefix) +  
-            str(id(self.content_actual)))
+            _payloads.register(self.content_actual, session=_session))
         object_array = NSArray.arrayWithObject(item)
         return object_array.ptr
         
+    def dragInteraction_session_didEndWithOperation_(_self, _cmd,
+    _interaction, _session, _operation):
+        _payloads.release_session(_session)
+        
 
 class UIDropInteractionDelegate(ObjCDelegate):
     """ docgen-ignore """
     
-    def __init__(self, view, handler_func, accept=None):
+    def __init__(self, view, handler_func, accept=None,
+            combine=False, max_concurrent=4, progress=None):
         self.accept_type = None
+        self.combine = combine
+        self.max_concurrent = max_concurrent
+        self.progress = progress
+        self.loader = None
         if type(accept) is type:
             if accept is str:
                 self.accept_type = NSString
             elif accept is ui.Image:
                 self.accept_type = UIImage
-            elif accept is bytearray:
+            elif accept is bytearray or accept is File:
                 self.accept_type = NSData
             accept = functools.partial(
                 lambda dtype, d, s, r: type(d) is dtype, accept)
@@ -824,9 +1522,12 @@ class UIDropInteractionDelegate(ObjCDelegate):
         accept_func = self.functions['accept']
 
         if session.localDragSession():
-            if accept_func is not None:
-                for item in session.items():
-                    data = _to_pyobject(item)
+            for item in session.items():
+                data = _to_pyobject(item)
+                if data is None:
+                    proposal = 1 # UIDropOperationForbidden
+                    break
+                if accept_func is not None:
                     payload = data['payload']
                     sender = data['sender']
                     if not accept_func(payload, sender, self.view):
@@ -850,45 +1551,37 @@ class UIDropInteractionDelegate(ObjCDelegate):
         if session.localDragSession():
             for item in session.items():
                 data = _to_pyobject(item)
-                payload = data['payload']
-                sender = data['sender']
-                handler(payload, sender, self.view)
-        else:
-            if self.accept_type is not None:
-                
-                def completion_handler(_cmd, _object, _error):
-                    obj = ObjCInstance(_object)
-                    payload = None
-                    if _is_objc_type(obj, NSString):
-                        payload = str(obj)
-                    elif _is_objc_type(obj, UIImage):
-                        payload = ui.Image.from_data(uiimage_to_png(obj))
-                    elif _is_objc_type(obj, NSURL):
-                        file_url = str(obj)
-                    handler(file_url, None, self.view)
-                handler_block = ObjCBlock(
-                    completion_handler, restype=None,
-                    argtypes=[c_void_p, c_void_p, c_void_p])
-                retain_global(handler_block)
-                
-                for item in session.items():
-                    print('by item')
-                    provider = item.itemProvider()
-                    if provider.canLoadObjectOfClass(self.accept_type):
-                        provider.loadObjectOfClass_completionHandler_(
-                        self.accept_type, handler_block)
-                    elif self.accept_type is NSData:
-                        print('accepting')
-                        type_identifier = None
-                        suggested_name = None
-                        try:
-                            type_identifier = provider.registeredTypeIdentifiers()[0]
-                            suggested_name = provider.suggestedName()
-                        except: pass
-                        print(type_identifier, suggested_name)
-                        if type_identifier and suggested_name:
-                            provider.loadFileRepresentationForTypeIdentifier_completionHandler_(
-                                type_identifier, handler_block)
+                if data is None:
+                    continue
+                handler(data['payload'], data['sender'], self.view)
+        elif self.accept_type is not None:
+            view = self.view
+            items = [
+                _ProviderItem(item.itemProvider(), self.accept_type)
+                for item in session.items()
+            ]
+            on_item = on_complete = on_progress = None
+            if self.combine:
+                on_complete = lambda payloads: run_on_main(
+                    _deliver_drop, handler, payloads, view)
+            else:
+                on_item = lambda index, payload: run_on_main(
+                    _deliver_drop, handler, payload, view)
+            if self.progress:
+                on_progress = lambda loader: run_on_main(
+                    self.progress, loader)
+            self.loader = DropLoader(
+                items,
+                on_complete=on_complete,
+                on_item=on_item,
+                on_progress=on_progress,
+                max_concurrent=self.max_concurrent,
+            ).start()
+            
+    def cancel(self):
+        """ Cancel loading the items of the latest cross-app drop. """
+        if self.loader is not None:
+            self.loader.cancel()
 
 
 #docgen: Drag and drop                                
@@ -902,7 +1595,8 @@ def drag(view, payload, allow_others=False):
     by reference.
     
     If the `payload` is a text string or a `ui.Image`, it can be dragged
-    (copied) to another app (on iPad).
+    (copied) to another app (on iPad). To drag a file, use a `File(path)`
+    payload; the file is offered from disk, not read into memory.
     There is also built-in support for dropping text to any `ui.TextField` or
     `ui.TextView`. 
     
@@ -919,17 +1613,27 @@ def drag(view, payload, allow_others=False):
     UIDragInteractionDelegate(view, payload, allow_others)
     
 @on_main_thread
-def drop(view, action, accept=None):
+def drop(view, action, accept=None,
+        combine=False, max_concurrent=4, progress=None):
     """ Sets the `view` as a drop target, calling the `action` function with
     dropped data.
     
+    Returns an object with a `cancel()` method, to cancel loading the items of
+    an ongoing cross-app drop.
+    
     Additional parameters:
 
     * `accept` - Control which data will be accepted for dropping. Simplest
     option is to provide an accepted Python type like `dict` or `ui.Label`.
     
-      For cross-app drops, only two types are currently supported: `str` for
-      plain text, and `ui.Image` for images.
+      For cross-app drops, the supported types are `str` for plain text,
+      `ui.Image` for images, and `File` for files. Dropped files are copied
+      into a temporary directory, and the handler gets a `File` with the path
+      of the copy; use its `chunks()` or `mmap()` to read large files. The
+      copy is deleted when the handler returns, unless the handler calls
+      `keep()` on the `File`; kept copies can be removed with `delete()`,
+      and any left over are removed the next time this module is
+      imported.
       
       For in-app drops, the `accept` argument can also be a function that will
       be called when a drag enters the view. Function gets same parameters
@@ -947,9 +1651,22 @@ def drop(view, action, accept=None):
     * `sender` - Source view of the drag and drop. This is `None` for drags
     between apps.
     * `receiver` - Same as `view`.
+    
+    Items of a cross-app drop are loaded concurrently, and the `action`
+    function is called in the main thread as each item becomes available.
+    Additional parameters to control the loading:
+        
+    * `combine` - Set to True to call `action` only once, after all items
+      have loaded, with a list of the loaded items as `data`. Items that
+      fail to load are left out.
+    * `max_concurrent` - Maximum number of items loading at the same time.
+    * `progress` - Function called in the main thread as items load, and if
+      the loading is cancelled. The function gets one argument, an object
+      with `loaded`, `total`, `fraction` and `cancelled` attributes.
     """
     
-    UIDropInteractionDelegate(view, action, accept)
+    return UIDropInteractionDelegate(view, action, accept,
+        combine, max_concurrent, progress)
 
 
 if __name__ == '__main__':
@@ -1149,7 +1866,7 @@ if __name__ == '__main__':
     drop_file_l = create_label('Drop file')
     
     def file_dropped(data, sender, receiver):
-        print(data)
+        print(data, data.size)
         
-    drop(drop_file_l, file_dropped, accept=bytearray)
+    drop(drop_file_l, file_dropped, accept=File)
 
@@ -2,6 +2,8 @@ import math
 
 import ui
 
+from ui3.cache import LRUCache
+
 
 class GridView(ui.View):
     'Places subviews as squares that fill the available space.'
@@ -25,6 +27,8 @@ class GridView(ui.View):
                  count_x=None,
                  count_y=None,
                  gap=MARGIN,
+                 data_source=None,
+                 prefetch_rows=2,
                  **kwargs):
         '''By default, subviews are laid out in a grid as squares of optimal size and
         centered in the view.
@@ -39,6 +43,25 @@ class GridView(ui.View):
             (no longer squares)
           * `LEADING, TRAILING` (`pack_x` only)
           * `TOP, BOTTOM` (`pack_y` only)
+
+        If you give a `data_source`, the items are not subviews but cells
+        that are created on demand in a scroll view, and recycled when they
+        scroll out of sight. `count_x` is then required. The data source
+        object implements these methods:
+
+          * `gridview_number_of_items(gridview)` - Return the item count
+          * `gridview_configure_cell(gridview, cell, index)` - Set up a
+            (possibly recycled) cell to show the item at `index`
+          * `gridview_make_cell(gridview)` - Optional, return a new cell view
+            (default is a plain `ui.View`)
+          * `gridview_prefetch_items(gridview, indexes)` - Optional, called
+            with the items in the `prefetch_rows` rows just outside the
+            visible area, e.g. to start loading images
+          * `gridview_cancel_prefetch(gridview, indexes)` - Optional, called
+            with previously prefetched items that are no longer near the
+            visible area
+
+        Call `reload` when the data changes.
         '''
 
         super().__init__(**kwargs)
@@ -58,6 +81,25 @@ class GridView(ui.View):
 
         self.gap = gap
 
+        self._frame_cache = LRUCache(maxsize=8)
+
+        self.data_source = data_source
+        self.prefetch_rows = prefetch_rows
+        self.scroll_view = None
+        if data_source is not None:
+            if count_x is None:
+                raise ValueError('count_x is required with a data_source')
+            self._item_count = 0
+            self._cells = {}
+            self._cell_pool = []
+            self._prefetched = set()
+            self._data_geometry = (None, None)
+            self.scroll_view = ui.ScrollView(
+                frame=self.bounds, flex='WH',
+                delegate=self,
+            )
+            super().add_subview(self.scroll_view)
+
     def dimensions(self, count):
         if self.height == 0:
             return 1, count
@@ -81,9 +123,47 @@ class GridView(ui.View):
         return best_x, best_y
 
     def layout(self):
+        if self.data_source is not None:
+            self._layout_cells()
+            return
+
         count = len(self.subviews)
         if count == 0: return
 
+        for view, frame in zip(self.subviews, self.frames(count)):
+            if tuple(view.frame) != frame:
+                view.frame = frame
+
+    def frames(self, count):
+        '''Returns the frames for `count` subviews as a tuple of
+        `(x, y, width, height)` tuples.
+
+        Results are memoized by the size of the view and the packing
+        parameters, so repeated layouts with no changes are cheap.'''
+        key = (count, self.width, self.height, self.pack_x, self.pack_y,
+               self.count_x, self.count_y, self.gap, self.border_width)
+        frames = self._frame_cache.get(key)
+        if frames is None:
+            frames = self._calculate_frames(count)
+            self._frame_cache.put(key, frames)
+        return frames
+
+    def _calculate_frames(self, count):
+        (count_x, count_y, x, x_step, y, y_step,
+         width, height) = self._geometry(count, self.width, self.height)
+        frames = []
+        for row in range(count_y):
+            for col in range(count_x):
+                if len(frames) == count:
+                    return tuple(frames)
+                frames.append((x + col * x_step, y + row * y_step,
+                               width, height))
+        return tuple(frames)
+
+    def _geometry(self, count, width, height):
+        '''Returns the grid as a tuple of `(count_x, count_y, x, x_step, y,
+        y_step, cell_width, cell_height)`, where `x` and `y` are the position
+        of the first cell.'''
         count_x, count_y = self.count_x, self.count_y
         if count_x is None and count_y is None:
             count_x, count_y = self.dimensions(count)
@@ -98,8 +178,8 @@ class GridView(ui.View):
 
         borders = 2 * self.border_width
 
-        dim_x = (self.width - borders - (count_x + 1) * self.gap) / count_x
-        dim_y = (self.height - borders - (count_y + 1) * self.gap) / count_y
+        dim_x = (width - borders - (count_x + 1) * self.gap) / count_x
+        dim_y = (height - borders - (count_y + 1) * self.gap) / count_y
 
         dim = min(dim_x, dim_y)
 
@@ -110,30 +190,140 @@ class GridView(ui.View):
         free_count_x = exp_pack_x.count('_')
         free_count_y = exp_pack_y.count('_')
 
+        per_free_x = per_free_y = 0
         if free_count_x > 0:
             per_free_x = (
-                self.width - borders - count_x * dim -
+                width - borders - count_x * dim -
                 (count_x + 1 - free_count_x) * self.gap) / free_count_x
         if free_count_y > 0:
             per_free_y = (
-                self.height - borders - count_y * dim -
+                height - borders - count_y * dim -
                 (count_y + 1 - free_count_y) * self.gap) / free_count_y
 
         real_dim_x = dim_x if free_count_x == 0 else dim
         real_dim_y = dim_y if free_count_y == 0 else dim
 
-        subviews = iter(self.subviews)
-        y = self.border_width + (per_free_y if self.top_free else self.gap)
-        for row in range(count_y):
-            x = self.border_width + (per_free_x
-                                     if self.leading_free else self.gap)
-            for col in range(count_x):
-                try:
-                    view = next(subviews)
-                except StopIteration:
-                    return
-                view.frame = (x, y, real_dim_x, real_dim_y)
-                x += real_dim_x + (per_free_x
-                                   if self.center_x_free else self.gap)
-            y += real_dim_y + (per_free_y if self.center_y_free else self.gap)
+        return (
+            count_x, count_y,
+            self.border_width + (per_free_x if self.leading_free else self.gap),
+            real_dim_x + (per_free_x if self.center_x_free else self.gap),
+            self.border_width + (per_free_y if self.top_free else self.gap),
+            real_dim_y + (per_free_y if self.center_y_free else self.gap),
+            real_dim_x, real_dim_y,
+        )
+
+    # Data source mode
+
+    def reload(self):
+        '''Recycle all cells and ask the data source for the items again.'''
+        for index in list(self._cells):
+            self._recycle(index)
+        cancel = getattr(self.data_source, 'gridview_cancel_prefetch', None)
+        if self._prefetched and cancel:
+            cancel(self, sorted(self._prefetched))
+        self._prefetched = set()
+        self._layout_cells()
+
+    def scrollview_did_scroll(self, scrollview):
+        self._update_cells()
+
+    def _layout_cells(self):
+        count = self.data_source.gridview_number_of_items(self)
+        self._item_count = count
+        width, height = self.scroll_view.width, self.scroll_view.height
+        content_height = 0
+        if count > 0:
+            content_height = self._content_geometry(count, width, height)[-1]
+        if tuple(self.scroll_view.content_size) != (width, content_height):
+            self.scroll_view.content_size = (width, content_height)
+        self._update_cells()
+
+    def _content_geometry(self, count, width, height):
+        key = (count, width, height, self.pack_x, self.pack_y,
+               self.count_x, self.gap, self.border_width)
+        cached_key, geometry = self._data_geometry
+        if cached_key == key:
+            return geometry
+        count_y = math.ceil(count / self.count_x)
+        borders = 2 * self.border_width
+        dim = (width - borders - (self.count_x + 1) * self.gap) / self.count_x
+        needed = borders + count_y * dim + (count_y + 1) * self.gap
+        content_height = max(height, needed)
+        geometry = self._geometry(count, width, content_height) + (
+            content_height,)
+        self._data_geometry = (key, geometry)
+        return geometry
+
+    def _update_cells(self):
+        count = self._item_count
+        if count == 0:
+            for index in list(self._cells):
+                self._recycle(index)
+            self._prefetch(set())
+            return
+
+        height = self.scroll_view.height
+        (count_x, count_y, x, x_step, y, y_step,
+         cell_width, cell_height, _) = self._content_geometry(
+            count, self.scroll_view.width, height)
+
+        top = self.scroll_view.content_offset[1]
+        bottom = top + height
+        if y_step > 0:
+            first_row = max(0, math.floor((top - cell_height - y) / y_step) + 1)
+            last_row = min(count_y - 1, math.ceil((bottom - y) / y_step) - 1)
+        else:
+            first_row, last_row = 0, count_y - 1
+
+        visible = range(
+            first_row * count_x, min(count, (last_row + 1) * count_x))
+
+        for index in list(self._cells):
+            if index not in visible:
+                self._recycle(index)
+
+        for index in visible:
+            row, col = divmod(index, count_x)
+            frame = (x + col * x_step, y + row * y_step,
+                     cell_width, cell_height)
+            cell = self._cells.get(index)
+            if cell is None:
+                cell = self._dequeue()
+                self._cells[index] = cell
+                self.data_source.gridview_configure_cell(self, cell, index)
+            if tuple(cell.frame) != frame:
+                cell.frame = frame
+
+        before = range(
+            max(0, first_row - self.prefetch_rows) * count_x,
+            first_row * count_x)
+        after = range(
+            min(count, (last_row + 1) * count_x),
+            min(count, (last_row + 1 + self.prefetch_rows) * count_x))
+        self._prefetch(set(before).union(after))
+
+    def _prefetch(self, indexes):
+        new = indexes - self._prefetched
+        gone = self._prefetched - indexes - set(self._cells)
+        self._prefetched = indexes
+        prefetch = getattr(self.data_source, 'gridview_prefetch_items', None)
+        if new and prefetch:
+            prefetch(self, sorted(new))
+        cancel = getattr(self.data_source, 'gridview_cancel_prefetch', None)
+        if gone and cancel:
+            cancel(self, sorted(gone))
+
+    def _dequeue(self):
+        if self._cell_pool:
+            cell = self._cell_pool.pop()
+            cell.hidden = False
+            return cell
+        make_cell = getattr(self.data_source, 'gridview_make_cell', None)
+        cell = make_cell(self) if make_cell else ui.View()
+        self.scroll_view.add_subview(cell)
+        return cell
 
+    def _recycle(self, index):
+        cell = self._cells.pop(index)
+        cell.hidden = True
+        self._cell_pool.append(cell)
@@ -0,0 +1,248 @@
+"""
+Small markup parser for the RichLabel tag language
+
+Parses strings like `<b>Bold <f Courier 12>and mono</f></b>` into a tree of
+`Node`s. The nodes implement the small part of the BeautifulSoup API that
+RichLabel uses (`name`, `attrs`, `children`, `contents`, `string`, `append`,
+`insert` and `replace_with`), and parsing follows the html5lib rules that
+matter for RichLabel markup:
+
+  * Tag and attribute names are lowercased, and only the first of repeated
+    attributes is kept. Attributes are usually bare words, with an empty
+    string as the value.
+  * Character references like `&lt;` are decoded, and line breaks are
+    normalized to `\\n`.
+  * Whitespace at the very start of the document is dropped.
+  * A `<` that does not start a tag is plain text, and comments are
+    skipped.
+  * End tags close everything up to the latest open tag with the same name;
+    end tags without a matching open tag are ignored, and tags left open
+    are closed at the end.
+  * HTML formatting tags like `b`, `i`, `u` and `s` that are closed this
+    way, by the end tag of an enclosing tag, are reopened for the content
+    that follows, so in `<c red>a<b>b</c>c` the last "c" is bold.
+
+Unlike html5lib, `<tag/>` is an empty element, and `body` and other HTML
+tag names get no special treatment.
+"""
+
+import html
+import re
+
+_token = re.compile(r'''
+    (?P<comment><!--.*?(?:-->|\Z))
+  | <(?P<end>/?)(?P<name>[A-Za-z][^\s/>]*)
+    (?P<attrs>(?:[^>"']|"[^"]*"|'[^']*')*)>
+''', re.VERBOSE | re.DOTALL)
+
+_attribute = re.compile(r'''
+    (?P<key>[^\s/>=][^\s/>=]*)
+    (?:\s*=\s*(?P<value>"[^"]*"|'[^']*'|[^\s>]*))?
+''', re.VERBOSE)
+
+_leading_space = ' \t\n\r\f'
+
+# Tags that html5lib reopens when they are closed out of order
+_formatting = frozenset((
+    'a', 'b', 'big', 'code', 'em', 'font', 'i', 'nobr', 's', 'small',
+    'strike', 'strong', 'tt', 'u',
+))
+
+
+class Node:
+    """
+    Element or text node. Text nodes have `name` `None` and the text in
+    `string`.
+    """
+
+    __slots__ = ('name', 'attrs', 'contents', 'parent', 'string')
+
+    def __init__(self, name=None, attrs=None, string=None):
+        self.name = name
+        self.attrs = {} if attrs is None else attrs
+        self.contents = []
+        self.parent = None
+        self.string = string
+
+    @property
+    def children(self):
+        return iter(self.contents)
+
+    def append(self, child):
+        self.insert(len(self.contents), child)
+
+    def insert(self, index, child):
+        if child.parent is not None:
+            siblings = child.parent.contents
+            position = _index(siblings, child)
+            del siblings[position]
+            if child.parent is self and position < index:
+                index -= 1
+        child.parent = self
+        self.contents.insert(index, child)
+
+    def replace_with(self, other):
+        parent = self.parent
+        if parent is None or other is self:
+            return
+        if other.parent is not None:
+            other.parent.contents.pop(_index(other.parent.contents, other))
+        parent.contents[_index(parent.contents, self)] = other
+        other.parent = parent
+        self.parent = None
+
+    def copy(self):
+        """ Returns a deep copy of the node, without a parent. """
+        other = Node(self.name, dict(self.attrs), self.string)
+        for child in self.contents:
+            child = child.copy()
+            child.parent = other
+            other.contents.append(child)
+        return other
+
+    def get_text(self):
+        if self.name is None:
+            return self.string
+        return ''.join(child.get_text() for child in self.contents)
+
+    def __str__(self):
+        if self.name is None:
+            return html.escape(self.string, quote=False)
+        inner = ''.join(str(child) for child in self.contents)
+        if self.name == '[document]':
+            return inner
+        attrs = ''.join(
+            f' {key}' if value == '' else f' {key}="{html.escape(value)}"'
+            for key, value in self.attrs.items()
+        )
+        return f'<{self.name}{attrs}>{inner}</{self.name}>'
+
+    def __repr__(self):
+        return str(self)
+
+
+def _index(siblings, node):
+    for i, sibling in enumerate(siblings):
+        if sibling is node:
+            return i
+    raise ValueError('Node not found in parent')
+
+
+def parse_attributes(attr_str):
+    attrs = {}
+    for match in _attribute.finditer(attr_str):
+        key = match.group('key').lower()
+        if key in attrs:
+            continue
+        value = match.group('value') or ''
+        if value[:1] in ('"', "'"):
+            value = value[1:-1]
+        attrs[key] = html.unescape(value)
+    return attrs
+
+
+def parse(markup):
+    """
+    Parses the markup string and returns the root `Node`, named
+    `[document]`.
+    """
+    markup = markup.replace('\r\n', '\n').replace('\r', '\n')
+    markup = markup.lstrip(_leading_space)
+
+    root = Node('[document]')
+    stack = [root]
+    # Open formatting elements, including ones closed out of order
+    active = []
+    position = 0
+
+    def reopen():
+        for i, node in enumerate(active):
+            if any(open_node is node for open_node in stack):
+                continue
+            clone = Node(node.name, dict(node.attrs))
+            clone.parent = stack[-1]
+            stack[-1].contents.append(clone)
+            stack.append(clone)
+            active[i] = clone
+
+    def add_text(text):
+        if not text:
+            return
+        text = html.unescape(text)
+        reopen()
+        parent = stack[-1]
+        if parent.contents and parent.contents[-1].name is None:
+            parent.contents[-1].string += text
+        else:
+            node = Node(string=text)
+            node.parent = parent
+            parent.contents.append(node)
+
+    for match in _token.finditer(markup):
+        add_text(markup[position:match.start()])
+        position = match.end()
+        if match.group('comment'):
+            continue
+        name = match.group('name').lower()
+        if match.group('end'):
+            if name in _formatting:
+                closed = next((
+                    node for node in reversed(active) if node.name == name),
+                    None)
+                if closed is None:
+                    continue
+                active.remove(closed)
+                for depth in range(len(stack) - 1, 0, -1):
+                    if stack[depth] is closed:
+                        del stack[depth:]
+                        break
+                continue
+            for depth in range(len(stack) - 1, 0, -1):
+                if stack[depth].name == name:
+                    del stack[depth:]
+                    break
+            continue
+        attr_str = match.group('attrs')
+        self_closing = attr_str.rstrip().endswith('/')
+        reopen()
+        node = Node(name, parse_attributes(attr_str))
+        node.parent = stack[-1]
+        stack[-1].contents.append(node)
+        if not self_closing:
+            stack.append(node)
+            if name in _formatting:
+                active.append(node)
+    add_text(markup[position:])
+
+    return root
+
+
+class Template:
+    """
+    Wrapper markup like `<c white><b/></c>`, parsed once and expanded any
+    number of times.
+
+    The content goes into the innermost element of the chain of first
+    children, e.g. into `b` in the example above.
+    """
+
+    def __init__(self, wrapper_str):
+        self.top = next(parse(wrapper_str).children)
+        self.path = []
+        node = self.top
+        while node.contents and node.contents[0].name is not None:
+            node = node.contents[0]
+            self.path.append(0)
+
+    def wrap(self, children):
+        """
+        Returns a new copy of the wrapper, with `children` moved to the end of
+        the innermost element.
+        """
+        top = self.top.copy()
+        bottom = top
+        for index in self.path:
+            bottom = bottom.contents[index]
+        for child in children:
+            bottom.append(child)
+        return top
@@ -0,0 +1,404 @@
+"""
+Momentum simulation for flinging views
+
+`Momentum` continues the movement of a pan gesture after the finger lifts:
+the `ENDED` velocity decelerates like in a scroll view, positions beyond the
+bounds are pulled back with a spring (rubber-banding), and optional snap
+points catch the movement.
+
+    engine = Momentum()
+
+    def pan_handler(data):
+        global start
+        if data.began:
+            engine.stop(view)
+            start = view.center
+        elif data.changed:
+            view.center = start + data.translation
+        elif data.ended:
+            engine.fling(
+                view, view.center, data.velocity,
+                update=lambda x, y: setattr(view, 'center', (x, y)),
+                bounds=(0, 0, 400, 800),
+            )
+
+All flinging objects are stepped together with a fixed timestep, with their
+state kept in parallel columns (one per quantity) rather than per-object
+records. With numpy, which is included in Pythonista, the columns are arrays
+and every step is a handful of array operations over all objects; without
+it, they are plain lists stepped in a loop. Frames come from a clock: `TimerClock` (the default) drives the
+engine in Pythonista, and `ManualClock` is advanced by hand, e.g. in tests
+and benchmarks run outside Pythonista.
+"""
+
+import math
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+FRAME = 1 / 60
+
+# Deceleration rates per millisecond, as in UIScrollView
+NORMAL = 0.998
+FAST = 0.99
+
+_free = float('nan')
+
+# Columns of numbers, numpy arrays when vectorized
+_numeric = (
+    'x', 'y', 'vx', 'vy', 'tx', 'ty', 'min_x', 'max_x', 'min_y', 'max_y')
+
+
+class ManualClock:
+    """
+    Clock that only moves when `advance` is called.
+    """
+
+    def __init__(self):
+        self.time = 0.0
+        self.callback = None
+
+    def now(self):
+        return self.time
+
+    def start(self, callback):
+        self.callback = callback
+
+    def stop(self):
+        self.callback = None
+
+    @property
+    def running(self):
+        return self.callback is not None
+
+    def advance(self, seconds, frame=FRAME):
+        """
+        Moves time forward by `seconds`, delivering a frame every `frame`
+        seconds for as long as the engine keeps the clock running.
+        """
+        end = self.time + seconds
+        while self.callback is not None and self.time + frame <= end + 1e-9:
+            self.time += frame
+            self.callback(self.time)
+        if self.time < end:
+            self.time = end
+
+
+class TimerClock:
+    """
+    Clock that delivers frames with `ui.delay` in Pythonista.
+    """
+
+    def __init__(self, interval=FRAME):
+        self.interval = interval
+        self.callback = None
+
+    def now(self):
+        return time.perf_counter()
+
+    def start(self, callback):
+        was_running = self.running
+        self.callback = callback
+        if not was_running:
+            self._schedule()
+
+    def stop(self):
+        self.callback = None
+
+    @property
+    def running(self):
+        return self.callback is not None
+
+    def _schedule(self):
+        import ui
+        ui.delay(self._tick, self.interval)
+
+    def _tick(self):
+        if self.callback is None:
+            return
+        self.callback(self.now())
+        if self.callback is not None:
+            self._schedule()
+
+
+class Momentum:
+    """
+    Simulates any number of flinging objects.
+
+    Parameters:
+
+      * `clock` - Source of frames, `TimerClock()` by default.
+      * `timestep` - Fixed simulation step in seconds. Frames run as many
+        steps as fit in the time since the previous frame.
+      * `deceleration` - Rate the velocity is multiplied by per millisecond,
+        `NORMAL` or `FAST`, or anything between 0 and 1.
+      * `spring` - Angular frequency of the rubber-band and snapping spring;
+        higher is snappier. The spring is critically damped, so it does not
+        oscillate.
+      * `rest_velocity`, `rest_distance` - Thresholds below which an object
+        is considered to have stopped.
+      * `vectorized` - Whether to step with numpy arrays; by default, numpy
+        is used if it is available.
+    """
+
+    MAX_FRAME = 0.25
+
+    def __init__(self, clock=None, timestep=1 / 120, deceleration=NORMAL,
+                 spring=15.0, rest_velocity=5.0, rest_distance=0.5,
+                 vectorized=None):
+        self.clock = clock or TimerClock()
+        self.timestep = timestep
+        self.deceleration = deceleration
+        self.spring = spring
+        self.rest_velocity = rest_velocity
+        self.rest_distance = rest_distance
+        if vectorized is None:
+            vectorized = numpy is not None
+        self.vectorized = vectorized
+
+        self.keys = []
+        self.index = {}
+        for name in _numeric:
+            setattr(self, name, numpy.zeros(16) if vectorized else [])
+        self.updates = []
+        self.ends = []
+
+        self.last_time = None
+        self.leftover = 0.0
+        self.steps = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    @property
+    def decay(self):
+        """ Velocity multiplier per timestep. """
+        return self.deceleration ** (self.timestep * 1000)
+
+    def project(self, position, velocity):
+        """
+        Returns the point where a free fling from `position` with `velocity`
+        would come to rest, ignoring bounds.
+        """
+        decay = self.decay
+        factor = self.timestep * decay / (1 - decay)
+        x, y = position
+        vx, vy = velocity
+        return x + vx * factor, y + vy * factor
+
+    def fling(self, key, position, velocity, update=None, end=None,
+              bounds=None, snap_points=None):
+        """
+        Starts flinging the object identified by `key`, replacing any fling
+        already running for the same key.
+
+        * `position`, `velocity` - Starting point and velocity in points per
+          second, e.g. `view.center` and `data.velocity` of a pan.
+        * `update` - Called with `x, y` on every frame while the object moves.
+        * `end` - Called with `x, y` when the object has come to rest.
+        * `bounds` - `(min_x, min_y, max_x, max_y)` limits for the position.
+          The object may overshoot, and is pulled back with a spring.
+        * `snap_points` - Points to come to rest at; the one closest to where
+          the fling would otherwise end is chosen.
+        """
+        self.stop(key)
+
+        x, y = position
+        vx, vy = velocity
+        min_x, min_y, max_x, max_y = bounds or (
+            -math.inf, -math.inf, math.inf, math.inf)
+        tx = ty = _free
+        if snap_points:
+            end_x, end_y = self.project(position, velocity)
+            tx, ty = min(
+                snap_points,
+                key=lambda point: (point[0] - end_x) ** 2 +
+                                  (point[1] - end_y) ** 2)
+            tx = min(max(tx, min_x), max_x)
+            ty = min(max(ty, min_y), max_y)
+
+        i = len(self.keys)
+        self.index[key] = i
+        self.keys.append(key)
+        self.updates.append(update)
+        self.ends.append(end)
+        values = (x, y, vx, vy, tx, ty, min_x, max_x, min_y, max_y)
+        if self.vectorized:
+            if i == len(self.x):
+                for name in _numeric:
+                    column = getattr(self, name)
+                    setattr(self, name, numpy.concatenate(
+                        (column, numpy.zeros(len(column)))))
+            for name, value in zip(_numeric, values):
+                getattr(self, name)[i] = value
+        else:
+            for name, value in zip(_numeric, values):
+                getattr(self, name).append(value)
+
+        if not self.clock.running:
+            self.last_time = self.clock.now()
+            self.leftover = 0.0
+            self.clock.start(self.frame)
+
+    def stop(self, key):
+        """
+        Stops the fling of the object without calling its `end` function.
+        Returns the current `(x, y)`, or `None` if the object was not moving.
+        """
+        i = self.index.pop(key, None)
+        if i is None:
+            return None
+        position = (float(self.x[i]), float(self.y[i]))
+        last = len(self.keys) - 1
+        for values in self._columns():
+            values[i] = values[last]
+            if type(values) is list:
+                values.pop()
+        if i != last:
+            self.index[self.keys[i]] = i
+        if not self.keys:
+            self.clock.stop()
+        return position
+
+    def stop_all(self):
+        for key in list(self.keys):
+            self.stop(key)
+
+    def position(self, key):
+        i = self.index[key]
+        return float(self.x[i]), float(self.y[i])
+
+    def frame(self, now):
+        """
+        Advances the simulation to `now`, then calls `update` of every moving
+        object and `end` of the objects that came to rest.
+        """
+        elapsed = min(now - self.last_time, self.MAX_FRAME) + self.leftover
+        self.last_time = now
+        steps = int(elapsed / self.timestep)
+        self.leftover = elapsed - steps * self.timestep
+        for _ in range(steps):
+            self.step()
+
+        finished = self._settle()
+        count = len(self.keys)
+        xs, ys = self.x[:count], self.y[:count]
+        if self.vectorized:
+            xs, ys = xs.tolist(), ys.tolist()
+        moving = list(zip(self.updates, xs, ys))
+        for update, x, y in moving:
+            if update is not None:
+                update(x, y)
+        for key in finished:
+            i = self.index.get(key)
+            if i is None:
+                continue
+            x, y, end = float(self.x[i]), float(self.y[i]), self.ends[i]
+            self.stop(key)
+            if end is not None:
+                end(x, y)
+
+    def step(self):
+        """ Advances all objects by one timestep. """
+        step_axis = (
+            self._step_axis_arrays if self.vectorized else self._step_axis)
+        step_axis(self.x, self.vx, self.tx, self.min_x, self.max_x)
+        step_axis(self.y, self.vy, self.ty, self.min_y, self.max_y)
+        self.steps += 1
+
+    def _step_axis_arrays(self, pos, vel, target, low, high):
+        n = len(self.keys)
+        p, v = pos[:n], vel[:n]
+        t, lo, hi = target[:n], low[:n], high[:n]
+        # Spring towards the snap target, or the bound that was crossed
+        goal = numpy.where(
+            t == t, t,
+            numpy.where(p < lo, lo, numpy.where(p > hi, hi, _free)))
+        springing = goal == goal
+        k = self.spring * self.spring
+        c = 2 * self.spring
+        h = self.timestep
+        with numpy.errstate(invalid='ignore'):
+            sprung = v - (k * (p - goal) + c * v) * h
+        v[:] = numpy.where(springing, sprung, v * self.decay)
+        p += v * h
+
+    def _step_axis(self, pos, vel, target, low, high):
+        h = self.timestep
+        decay = self.decay
+        k = self.spring * self.spring
+        c = 2 * self.spring
+        for i in range(len(pos)):
+            p = pos[i]
+            v = vel[i]
+            t = target[i]
+            if t == t:
+                v -= (k * (p - t) + c * v) * h
+            elif p < low[i]:
+                v -= (k * (p - low[i]) + c * v) * h
+            elif p > high[i]:
+                v -= (k * (p - high[i]) + c * v) * h
+            else:
+                v *= decay
+            pos[i] = p + v * h
+            vel[i] = v
+
+    def _settle(self):
+        """ Snaps objects that have come to rest, and returns their keys. """
+        if self.vectorized:
+            return self._settle_arrays()
+        finished = []
+        rest_velocity = self.rest_velocity
+        for i in range(len(self.keys)):
+            x = self._rest(self.x[i], self.vx[i], self.tx[i],
+                           self.min_x[i], self.max_x[i], rest_velocity)
+            if x is None:
+                continue
+            y = self._rest(self.y[i], self.vy[i], self.ty[i],
+                           self.min_y[i], self.max_y[i], rest_velocity)
+            if y is None:
+                continue
+            self.x[i], self.y[i] = x, y
+            self.vx[i] = self.vy[i] = 0.0
+            finished.append(self.keys[i])
+        return finished
+
+    def _rest(self, p, v, t, low, high, rest_velocity):
+        if abs(v) >= rest_velocity:
+            return None
+        goal = t if t == t else min(max(p, low), high)
+        if abs(p - goal) > self.rest_distance:
+            return None
+        return goal
+
+    def _settle_arrays(self):
+        n = len(self.keys)
+        x, y, vx, vy = self.x[:n], self.y[:n], self.vx[:n], self.vy[:n]
+        tx, ty = self.tx[:n], self.ty[:n]
+        goal_x = numpy.where(
+            tx == tx, tx, numpy.clip(x, self.min_x[:n], self.max_x[:n]))
+        goal_y = numpy.where(
+            ty == ty, ty, numpy.clip(y, self.min_y[:n], self.max_y[:n]))
+        resting = (
+            (numpy.abs(vx) < self.rest_velocity) &
+            (numpy.abs(vy) < self.rest_velocity) &
+            (numpy.abs(x - goal_x) <= self.rest_distance) &
+            (numpy.abs(y - goal_y) <= self.rest_distance))
+        finished = numpy.flatnonzero(resting)
+        x[finished] = goal_x[finished]
+        y[finished] = goal_y[finished]
+        vx[finished] = vy[finished] = 0.0
+        return [self.keys[i] for i in finished.tolist()]
+
+    def _columns(self):
+        return (
+            self.keys, self.x, self.y, self.vx, self.vy, self.tx, self.ty,
+            self.min_x, self.max_x, self.min_y, self.max_y,
+            self.updates, self.ends,
+        )
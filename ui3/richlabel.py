@@ -1,17 +1,55 @@
 import ast
+import collections
 import ctypes
 from itertools import chain
+import json
+import os
 import types
 
-import bs4
+try:
+    import bs4
+except ImportError:
+    bs4 = None
 
 import objc_util
 import ui
 
+from ui3 import markup
+from ui3.cache import LRUCache
+from ui3.textruns import (
+    UpdateStats, build_runs, diff_runs, diff_text, run_stats, utf16_length,
+    utf16_offsets)
+
 
 NSMutableAttributedString = objc_util.ObjCClass('NSMutableAttributedString')
 UIFont = objc_util.ObjCClass('UIFont')
 NSShadow = objc_util.ObjCClass('NSShadow')
+UIDevice = objc_util.ObjCClass('UIDevice')
+
+
+def _binding_plan(cls):
+    """
+    Returns the names of the methods to bind and of the plain values to set
+    on each new label of the class, computed once per class. The values
+    themselves are read from the class when a label is created, so changes
+    to class attributes apply to later labels. Immutable values are set on
+    the label so that they can be changed per label; classes and tables are
+    shared through the `_rich_class` attribute of the label instead.
+    """
+    plan = cls.__dict__.get('_rich_binding_plan')
+    if plan is None:
+        methods = []
+        values = []
+        for key in dir(cls):
+            if key.startswith('__') or key.startswith('_rich'): continue
+            value = getattr(cls, key)
+            if callable(value) and type(value) is not type:
+                methods.append(key)
+            elif value is None or type(value) in (str, int, float, bool, tuple):
+                values.append(key)
+        plan = (tuple(methods), tuple(values))
+        setattr(cls, '_rich_binding_plan', plan)
+    return plan
 
 
 def get_fonts():
@@ -26,6 +64,125 @@ def get_fonts():
     return (font_name.lower() for font_name in chain(families, fonts))
     
 
+class FontCatalogue:
+    """
+    Set-like collection of the lowercase names of all font families and
+    faces.
+
+    Enumerating the fonts takes an ObjC call per font family, so the
+    catalogue is loaded on the first membership check, and saved to `path`.
+    Later launches read the file, as long as its version key, the catalogue
+    format and the iOS version, still matches. A name that is not found
+    triggers one reload from `UIFont`, in case fonts have been installed.
+    """
+    
+    FORMAT = 1
+    
+    def __init__(self, path):
+        self.path = path
+        self.fonts = None
+        self.refreshed = False
+        
+    def __contains__(self, font_name):
+        if self.fonts is None:
+            self.fonts = self._read() or self._refresh()
+        if font_name in self.fonts:
+            return True
+        if not self.refreshed:
+            self.fonts = self._refresh()
+            return font_name in self.fonts
+        return False
+        
+    def version(self):
+        return [self.FORMAT, str(UIDevice.currentDevice().systemVersion())]
+        
+    def _read(self):
+        try:
+            with open(self.path) as fp:
+                cached = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        if cached.get('version') != self.version():
+            return None
+        return set(cached['fonts'])
+        
+    def _refresh(self):
+        self.refreshed = True
+        fonts = set(get_fonts())
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w') as fp:
+                json.dump(
+                    {'version': self.version(), 'fonts': sorted(fonts)}, fp)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass
+        return fonts
+        
+        
+font_catalogue = FontCatalogue(os.path.expanduser(
+    '~/Library/Caches/ui3-font-catalogue.json'))
+    
+
+# Resolved fonts, colors and shadows, shared by all labels
+attribute_cache = LRUCache(512)
+
+
+def resolve_attribute(value):
+    """
+    Returns the ObjC object described by an attribute value of a formatter:
+    
+      * `('font', name, size, traits)`, with name `'system'` for the system
+        font
+      * `('style', text_style_name)` for the iOS preferred fonts
+      * `('color', red, green, blue, alpha)`
+      * `('shadow', (offset_x, offset_y), blur, (red, green, blue, alpha))`
+      
+    Other values, e.g. numbers, are returned as is.
+    
+    Fonts, colors and shadows are kept in `attribute_cache`, so labels with
+    the same formatting share the same ObjC objects. Text style fonts are
+    not cached, as they follow the user's text size setting.
+    """
+    if type(value) is not tuple:
+        return value
+    if value[0] == 'style':
+        return _create_attribute(value)
+    resolved = attribute_cache.get(value)
+    if resolved is None:
+        resolved = _create_attribute(value)
+        attribute_cache.put(value, resolved)
+    return resolved
+    
+    
+def _create_attribute(value):
+    kind = value[0]
+    if kind == 'font':
+        _, font_name, font_size, traits = value
+        if font_name == 'system':
+            return UIFont.systemFontOfSize_traits_(font_size, traits)
+        if font_name.lower() in font_catalogue:
+            return UIFont.fontWithName_size_traits_(
+                font_name, font_size, traits)
+        raise ValueError('Unknown font defined', font_name)
+    if kind == 'color':
+        return objc_util.UIColor.colorWithRed_green_blue_alpha_(*value[1:])
+    if kind == 'shadow':
+        _, offset, blur, color = value
+        shadow = NSShadow.alloc().init()
+        shadow.setShadowOffset_(objc_util.CGSize(*offset))
+        shadow.setShadowColor_(
+            objc_util.UIColor.colorWithRed_green_blue_alpha_(*color))
+        shadow.setShadowBlurRadius_(blur)
+        return shadow
+    if kind == 'style':
+        objc_style = objc_util.ObjCInstance(
+            ctypes.c_void_p.in_dll(objc_util.c, value[1]))
+        return UIFont.preferredFontForTextStyle_(objc_style)
+    raise ValueError('Unknown attribute value', value)
+    
+
 class RichLabel:
     
     # No default root
@@ -34,35 +191,35 @@ class RichLabel:
     # No custom tags
     custom = {}
     
+    # Set to True to parse with BeautifulSoup and html5lib instead of the
+    # built-in parser, for full HTML parsing rules
+    use_bs4 = False
+    
+    # Parsed markup shared by all labels, keyed by the markup, default and
+    # custom tags and the base font of the label. Inspect `hits` and `misses`,
+    # set `maxsize` to change the limit (0 disables caching).
+    parse_cache = LRUCache(256)
+    
     class RichText(types.SimpleNamespace):
+        ''' Formatters describe their effect with `attributes`, a dict of
+        attributed string keys and plain values; see `resolve_attribute`. '''
         
         trait = 0
         
-        def set(self, key, value):
-            self.attr_str.addAttribute_value_range_(
-                objc_util.ns(key), value,
-                objc_util.NSRange(self.start, self.end - self.start))
+        def attributes(self):
+            return {}
                 
         @property
-        def objc_color(self):
-            return objc_util.UIColor.colorWithRed_green_blue_alpha_(
-                *ui.parse_color(self.color))
+        def color_value(self):
+            return ('color',) + tuple(ui.parse_color(self.color))
 
     class TextTrait(RichText):
         
-        all_fonts = set(get_fonts())
+        all_fonts = font_catalogue
         
-        def apply(self, attr_str):
-            self.attr_str = attr_str
-            if self.font_name == 'system':
-                font = UIFont.systemFontOfSize_traits_(
-                    self.font_size, self.collected_traits)
-            elif self.font_name.lower() in self.all_fonts:
-                font = UIFont.fontWithName_size_traits_(
-                    self.font_name, self.font_size, self.collected_traits)
-            else:
-                raise ValueError('Unknown font defined', self.font_name)
-            self.set('NSFont', font)
+        def attributes(self):
+            return {'NSFont': (
+                'font', self.font_name, self.font_size, self.collected_traits)}
 
     class Bold(TextTrait):
 
@@ -92,9 +249,8 @@ class RichLabel:
                 self.node.attrs) == 1, f'Give only one color: {self.node}'
             self.color = ui.parse_color(list(self.node.attrs.keys())[0])
 
-        def apply(self, attr_str):
-            self.attr_str = attr_str
-            self.set('NSColor', self.objc_color)
+        def attributes(self):
+            return {'NSColor': self.color_value}
                 
     class Outline(RichText):
         def __init__(self, **kwargs):
@@ -111,10 +267,11 @@ class RichLabel:
             self.outline_width = outline_width or 3.0
             self.color = outline_color or 'black'
 
-        def apply(self, attr_str):
-            self.attr_str = attr_str
-            self.set('NSStrokeColor', self.objc_color)
-            self.set('NSStrokeWidth', self.outline_width)
+        def attributes(self):
+            return {
+                'NSStrokeColor': self.color_value,
+                'NSStrokeWidth': self.outline_width,
+            }
 
     class Line(RichText):
         styles = {
@@ -139,10 +296,11 @@ class RichLabel:
             self.line_style = line_style or 1
             self.color = line_color or 'black'
                 
-        def apply(self, attr_str):
-            self.attr_str = attr_str
-            self.set(self.style_key, self.line_style)
-            self.set(self.color_key, self.objc_color)          
+        def attributes(self):
+            return {
+                self.style_key: self.line_style,
+                self.color_key: self.color_value,
+            }
                 
     class Underline(Line):
         
@@ -177,13 +335,9 @@ class RichLabel:
             self.offset = offset or (2, 2)
             self.color = color or 'grey'
 
-        def apply(self, attr_str):
-            self.attr_str = attr_str
-            shadow = NSShadow.alloc().init()
-            shadow.setShadowOffset_(objc_util.CGSize(*self.offset))
-            shadow.setShadowColor_(self.objc_color)
-            shadow.setShadowBlurRadius_(self.blur)
-            self.set('NSShadow', shadow)
+        def attributes(self):
+            return {'NSShadow': (
+                'shadow', tuple(self.offset), self.blur, self.color_value[1:])}
 
 
     class Oblique(RichText):
@@ -198,19 +352,13 @@ class RichLabel:
                 raise ValueError('Obliqueness should be a float', self.node)
             self.oblique = oblique or 0.25
             
-        def apply(self, attr_str):
-            self.attr_str = attr_str
-            self.set('NSObliqueness', self.oblique)
+        def attributes(self):
+            return {'NSObliqueness': self.oblique}
             
     class StandardFont(RichText):
         
-        def apply(self, attr_str):
-            self.attr_str = attr_str
-            objc_style = objc_util.ObjCInstance(
-                ctypes.c_void_p.in_dll(
-                    objc_util.c, self.style))
-            font = UIFont.preferredFontForTextStyle_(objc_style)
-            self.set('NSFont', font)
+        def attributes(self):
+            return {'NSFont': ('style', self.style)}
         
     class Body(StandardFont):
         
@@ -298,32 +446,202 @@ class RichLabel:
         'black': 1.0,
     }
 
+    # Number of chunks append_rich_text keeps, None for no limit
+    append_limit = None
+
+    # (text, runs, attributed string) of the latest rich_text
+    _rendered = None
+    # (attributed string, deque of (text, runs) chunks) of append_rich_text
+    _stream = None
+
     def __new__(cls, *args, **kwargs):
         target_instance = ui.Label(*args, **kwargs)
-        for key in dir(cls):
-            if key.startswith('__'): continue
-            value = getattr(cls, key)
-            if callable(value) and type(value) is not type:
-                setattr(target_instance, key,
-                        types.MethodType(value, target_instance))
-            else:
-                setattr(target_instance, key, value)
+        methods, values = _binding_plan(cls)
+        target_instance._rich_class = cls
+        for key in values:
+            setattr(target_instance, key, getattr(cls, key))
+        for key in methods:
+            setattr(target_instance, key,
+                    types.MethodType(getattr(cls, key), target_instance))
         return target_instance
 
     def rich_text(self, rich_text_str):
         #rich_text_str = self.default.format(rich_text_str)
         
-        text, formats = self._parse_string(rich_text_str)
+        text, runs, stats = self._parse_runs(rich_text_str)
+        self.run_stats = stats
+        self._render(text, runs)
+        
+    def compile_rich_text(self, rich_text_str):
+        ''' Returns the plain text and attribute runs of the markup, as
+        used by `ui3.richpack` to precompile static strings. '''
+        text, runs, stats = self._parse_runs(rich_text_str)
+        return text, runs
+        
+    def load_rich_text(self, pack, name):
+        ''' Shows an entry of a precompiled `ui3.richpack` pack, without
+        parsing any markup. `pack` is a `RunPack` or the path of a pack
+        file. '''
+        if isinstance(pack, str):
+            from ui3.richpack import RunPack
+            with RunPack(pack) as run_pack:
+                text, runs = run_pack.get(name)
+        else:
+            text, runs = pack.get(name)
+        self.run_stats = None
+        self._render(text, runs)
+        
+    def _render(self, text, runs):
         attr_str = NSMutableAttributedString.alloc().initWithString_(text)
-        for f in reversed(formats):
-            f.apply(attr_str)
+        self._apply_runs(attr_str, text, runs)
+        self.update_stats = UpdateStats(len(text), len(runs))
+        self._rendered = (text, runs, attr_str)
+        self._stream = None
+        self.attributed_text_key = hash(tuple(runs))
         self.objc_instance.setAttributedText_(attr_str)
-
-    def _parse_string(self, rich_string: str):
-        soup = bs4.BeautifulSoup(rich_string, 'html5lib')
-        root = soup.body
+        
+    def append_rich_text(self, rich_text_str):
+        ''' Appends the markup to the text already shown, parsing only the
+        new chunk, e.g. for a log console. End the chunk with `\\n` to
+        keep lines separate.
+        
+        If `append_limit` is set, only that many of the latest chunks are
+        kept, and the oldest are removed from the start of the text without
+        touching the rest. '''
+        text, runs, stats = self._parse_runs(rich_text_str)
+        if self._stream is None:
+            chunks = collections.deque()
+            if self._rendered is None:
+                attr_str = NSMutableAttributedString.alloc().init()
+            else:
+                old_text, old_runs, attr_str = self._rendered
+                chunks.append((old_text, old_runs))
+            self._stream = (attr_str, chunks)
+        attr_str, chunks = self._stream
+        
+        chunk_str = NSMutableAttributedString.alloc().initWithString_(text)
+        self._apply_runs(chunk_str, text, runs)
+        attr_str.appendAttributedString_(chunk_str)
+        chunks.append((text, runs))
+        
+        evicted = evicted_units = 0
+        limit = self.append_limit
+        while limit is not None and len(chunks) > max(limit, 1):
+            evicted_text = chunks.popleft()[0]
+            evicted += len(evicted_text)
+            evicted_units += utf16_length(evicted_text)
+        if evicted_units:
+            attr_str.deleteCharactersInRange_(
+                objc_util.NSRange(0, evicted_units))
+        
+        self._rendered = None
+        self.run_stats = stats
+        self.update_stats = UpdateStats(len(text) + evicted, stats.run_calls)
+        self.attributed_text_key = hash((
+            getattr(self, 'attributed_text_key', None),
+            tuple(runs), evicted))
+        self.objc_instance.setAttributedText_(attr_str)
+        
+    def _current(self):
+        ''' Returns the text, runs and attributed string shown. '''
+        if self._stream is None:
+            return self._rendered
+        attr_str, chunks = self._stream
+        texts, runs, offset = [], [], 0
+        for chunk_text, chunk_runs in chunks:
+            texts.append(chunk_text)
+            runs.extend(run.shifted(offset) for run in chunk_runs)
+            offset += len(chunk_text)
+        return ''.join(texts), runs, attr_str
+        
+    def update_rich_text(self, rich_text_str):
+        ''' Like `rich_text`, but only changes the characters and attribute
+        runs that differ from the text shown previously, e.g. for a
+        ticking counter.
+        
+        The size of the change is available as `label.update_stats`, with
+        the number of `characters` replaced and attribute `runs` set. '''
+        current = self._current()
+        if current is None:
+            self.rich_text(rich_text_str)
+            return
+        old_text, old_runs, attr_str = current
+        text, runs, stats = self._parse_runs(rich_text_str)
+        if text == old_text and runs == old_runs:
+            self.update_stats = UpdateStats(0, 0)
+            return
+        start, old_end, new_end = edit = diff_text(old_text, text)
+        if old_end > start or new_end > start:
+            offset = utf16_offsets(old_text)
+            first = offset(start)
+            attr_str.replaceCharactersInRange_withString_(
+                objc_util.NSRange(first, offset(old_end) - first),
+                text[start:new_end])
+        changed = diff_runs(old_runs, runs, edit)
+        self._apply_runs(attr_str, text, changed, skip_empty=False)
+        self.run_stats = stats
+        self.update_stats = UpdateStats(
+            max(old_end, new_end) - start, len(changed))
+        self._rendered = (text, runs, attr_str)
+        self._stream = None
+        self.attributed_text_key = hash(tuple(runs))
+        self.objc_instance.setAttributedText_(attr_str)
+        
+    def _apply_runs(self, attr_str, text, runs, skip_empty=True):
+        ''' Sets the attributes of each run of `text` with one ObjC call. '''
+        offset = utf16_offsets(text)
+        resolved = {}
+        for run in runs:
+            if skip_empty and not run.attributes:
+                continue
+            attributes = resolved.get(run.attributes)
+            if attributes is None:
+                attributes = resolved[run.attributes] = objc_util.ns({
+                    key: resolve_attribute(value)
+                    for key, value in run.attributes
+                })
+            start = offset(run.start)
+            attr_str.setAttributes_range_(
+                attributes, objc_util.NSRange(start, offset(run.end) - start))
+
+    def _parse_markup(self, markup_str):
+        if self.use_bs4:
+            if bs4 is None:
+                raise ImportError(
+                    'use_bs4 needs BeautifulSoup (bs4) and html5lib')
+            return bs4.BeautifulSoup(markup_str, 'html5lib').body
+        return markup.parse(markup_str)
+
+    def _base_font(self):
+        font, font_size = self.font
+        if self.objc_instance.font().isSystemFont():
+            font = 'system'
+        return font, font_size
+
+    def _parse_runs(self, rich_string):
+        ''' Returns the text, its attribute runs, and the ObjC call
+        statistics for applying them. Only these label-independent results
+        are cached, not the formatters, which refer to the label. '''
+        base_font = self._base_font()
+        key = (
+            rich_string,
+            self._rich_class,
+            self.use_bs4,
+            self.default,
+            tuple(self._rich_class.custom.items()),
+            base_font,
+        )
+        parse_cache = self._rich_class.parse_cache
+        parsed = parse_cache.get(key)
+        if parsed is None:
+            parsed = self._parse_uncached(rich_string, base_font)
+            parse_cache.put(key, parsed)
+        return parsed
+
+    def _parse_uncached(self, rich_string, base_font):
+        root = self._parse_markup(rich_string)
         if self.default:
-            self.wrap_root(soup.body, self.default)
+            self.wrap_root(root, self.default)
 
         formats = []
 
@@ -335,9 +653,9 @@ class RichLabel:
                     collected_text += t
                     end += len(t)
                 else:
-                    if node.name in self.custom:
+                    if node.name in self._rich_class.custom:
                         node = self.wrap_node(node)
-                    format_class = self._tag_to_class[node.name]
+                    format_class = self._rich_class._tag_to_class[node.name]
                     collected_traits = traits | format_class.trait
                     formatter = format_class(
                         label=self,
@@ -363,14 +681,21 @@ class RichLabel:
 
             return end, collected_text
 
-        font, font_size = self.font
-        if self.objc_instance.font().isSystemFont():
-            font = 'system'
+        font, font_size = base_font
         end, text = process(root, 0, font, font_size, 0)
         
-        return text, formats
+        # Outer formats are applied first, inner ones override them
+        spans = [
+            (f.start, f.end, f.attributes()) for f in reversed(formats)
+        ]
+        runs = build_runs(len(text), spans)
+        return text, runs, run_stats(spans, runs)
         
     def wrap_root(self, root, wrapper_str):
+        if not self.use_bs4:
+            root.insert(0, self._template(wrapper_str).wrap(
+                list(root.contents)))
+            return
         top_node, bottom_node = self.get_wrapper_nodes(wrapper_str)
         # Move children
         for child in list(root.children):
@@ -379,15 +704,31 @@ class RichLabel:
         root.insert(0, top_node)
         
     def wrap_node(self, node):
-        top_node, bottom_node = self.get_wrapper_nodes(self.custom[node.name])
+        wrapper_str = self._rich_class.custom[node.name]
+        if not self.use_bs4:
+            top_node = self._template(wrapper_str).wrap(list(node.contents))
+            node.replace_with(top_node)
+            return top_node
+        top_node, bottom_node = self.get_wrapper_nodes(wrapper_str)
         for child in list(node.children):
             bottom_node.append(child)
         node.replace_with(top_node)
         return top_node
         
+    def _template(self, wrapper_str):
+        ''' Wrapper templates are compiled once per class. '''
+        cls = self._rich_class
+        templates = cls.__dict__.get('_rich_templates')
+        if templates is None:
+            templates = {}
+            setattr(cls, '_rich_templates', templates)
+        template = templates.get(wrapper_str)
+        if template is None:
+            template = templates[wrapper_str] = markup.Template(wrapper_str)
+        return template
+        
     def get_wrapper_nodes(self, wrapper_str):
-        wrapper_soup = bs4.BeautifulSoup(wrapper_str, 'html5lib')
-        top_node = next(wrapper_soup.html.body.children)
+        top_node = next(self._parse_markup(wrapper_str).children)
         control_node = bottom_node = top_node
         while control_node:
             bottom_node = control_node
@@ -0,0 +1,183 @@
+"""
+Precompiled rich text
+
+Static RichLabel markup can be compiled ahead of time into a pack file that
+holds the plain text and the attribute runs of each string, with fonts,
+colors, line styles, shadows and obliqueness already resolved to plain
+values. Labels then show the strings without parsing any markup:
+
+    from ui3.richpack import RunPack
+
+    pack = RunPack('strings.richpack')
+    label = RichLabel()
+    label.load_rich_text(pack, 'welcome')
+
+Packs are compiled in Pythonista, because colors and fonts are resolved
+with the `ui` module and the installed fonts:
+
+    python -m ui3.richpack compile markup_dir strings.richpack
+
+Every file in the directory becomes an entry named by its path relative to
+the directory, without the extension. Reading a pack does not need
+Pythonista:
+
+    python -m ui3.richpack list strings.richpack
+
+File format: a header with the version and the length of a JSON table,
+the table, and the entry data. The table lists the distinct attribute sets
+used by the runs and the offset of every entry. Entry data is the length of
+the UTF-8 text and the number of runs, the text, and the runs as
+`(start, end, attribute set)` triplets. Packs are read through a memory
+map, and entries are only decoded when requested.
+"""
+
+import json
+import mmap
+import os
+import struct
+
+from ui3.textruns import Run
+
+MAGIC = b'UI3R'
+VERSION = 1
+
+_header = struct.Struct('<4sHI')
+_entry = struct.Struct('<II')
+_run = struct.Struct('<III')
+
+
+def _tuples(value):
+    """ Turns the lists of decoded JSON back into tuples. """
+    if isinstance(value, list):
+        return tuple(_tuples(item) for item in value)
+    return value
+
+
+def write_pack(path, entries):
+    """
+    Writes a pack file. `entries` maps names to `(text, runs)`, where runs
+    are `ui3.textruns.Run`s.
+    """
+    attribute_sets = {}
+    offsets = {}
+    data = bytearray()
+    for name, (text, runs) in entries.items():
+        encoded = text.encode('utf-8')
+        offsets[name] = len(data)
+        data += _entry.pack(len(encoded), len(runs))
+        data += encoded
+        for run in runs:
+            index = attribute_sets.setdefault(
+                run.attributes, len(attribute_sets))
+            data += _run.pack(run.start, run.end, index)
+    table = json.dumps({
+        'attributes': list(attribute_sets),
+        'entries': offsets,
+    }, separators=(',', ':')).encode('utf-8')
+
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as fp:
+        fp.write(_header.pack(MAGIC, VERSION, len(table)))
+        fp.write(table)
+        fp.write(data)
+    os.replace(temp_path, path)
+
+
+class RunPack:
+    """
+    Read-only, memory-mapped pack file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fp:
+            self.map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, table_size = _header.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError('Not a rich text pack', path)
+        if version != VERSION:
+            raise ValueError('Unsupported rich text pack version', version)
+        start = _header.size
+        table = json.loads(self.map[start:start + table_size])
+        self.attribute_sets = [
+            _tuples(attributes) for attributes in table['attributes']]
+        self.offsets = table['entries']
+        self.data_start = start + table_size
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __contains__(self, name):
+        return name in self.offsets
+
+    def __iter__(self):
+        return iter(self.offsets)
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def get(self, name):
+        """ Returns the `(text, runs)` of the entry. """
+        position = self.data_start + self.offsets[name]
+        text_size, run_count = _entry.unpack_from(self.map, position)
+        position += _entry.size
+        text = self.map[position:position + text_size].decode('utf-8')
+        position += text_size
+        attribute_sets = self.attribute_sets
+        runs = [
+            Run(start, end, attribute_sets[index])
+            for start, end, index in _run.iter_unpack(
+                self.map[position:position + run_count * _run.size])
+        ]
+        return text, runs
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def compile_directory(directory, path, label=None):
+    """
+    Compiles every file in `directory` and its subdirectories with the
+    given RichLabel instance (a plain `RichLabel()` by default), and writes
+    the result to the pack file at `path`. Returns the number of entries.
+    """
+    if label is None:
+        from ui3.richlabel import RichLabel
+        label = RichLabel()
+    entries = {}
+    for folder, _, filenames in os.walk(directory):
+        for filename in sorted(filenames):
+            if filename.startswith('.'):
+                continue
+            file_path = os.path.join(folder, filename)
+            name = os.path.splitext(
+                os.path.relpath(file_path, directory))[0]
+            with open(file_path, encoding='utf-8') as fp:
+                entries[name.replace(os.sep, '/')] = label.compile_rich_text(
+                    fp.read())
+    write_pack(path, entries)
+    return len(entries)
+
+
+if __name__ == '__main__':
+
+    import sys
+
+    if len(sys.argv) == 4 and sys.argv[1] == 'compile':
+        count = compile_directory(sys.argv[2], sys.argv[3])
+        print(f'{count} entries written to {sys.argv[3]}')
+    elif len(sys.argv) == 3 and sys.argv[1] == 'list':
+        with RunPack(sys.argv[2]) as pack:
+            for name in pack:
+                text, runs = pack.get(name)
+                print(f'{name}: {len(text)} characters, {len(runs)} runs')
+    else:
+        print('Usage: python -m ui3.richpack compile DIRECTORY PACK\n'
+              '       python -m ui3.richpack list PACK')
+        sys.exit(1)
@@ -0,0 +1,120 @@
+"""
+Uniform grid index of rectangles, for fast point hit-testing
+
+Each rectangle is stored in every grid cell it overlaps, so a point query only
+looks at the few rectangles in the cell under the point. Updating a rectangle
+only touches the cells it leaves and enters.
+"""
+
+import math
+
+
+class SpatialGrid:
+    """
+    Maps keys to `(x, y, width, height)` rectangles.
+
+    Every key also has an `order`; when rectangles overlap, the one with the
+    highest order is considered topmost. By default, later insertions are on
+    top.
+    """
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entries = {}
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def rect(self, key):
+        return self.entries[key][0]
+
+    def insert(self, key, rect, order=None):
+        """
+        Adds the key, or moves it if it is already in the index. The order of
+        an existing key is kept unless a new one is given.
+        """
+        x, y, w, h = rect
+        rect = (x, y, w, h)
+        cells = self._cells_for(rect)
+        entry = self.entries.get(key)
+        if entry is None:
+            if order is None:
+                self.counter += 1
+                order = self.counter
+            old_cells = ()
+        else:
+            old_rect, old_cells, old_order = entry
+            if order is None:
+                order = old_order
+            if old_rect == rect:
+                self.entries[key] = (rect, old_cells, order)
+                return
+        for cell in old_cells:
+            if cell not in cells:
+                bucket = self.cells[cell]
+                bucket.discard(key)
+                if not bucket:
+                    del self.cells[cell]
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(key)
+        self.entries[key] = (rect, cells, order)
+
+    update = insert
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for cell in entry[1]:
+            bucket = self.cells[cell]
+            bucket.discard(key)
+            if not bucket:
+                del self.cells[cell]
+
+    def query(self, x, y):
+        """
+        Returns the keys whose rectangles contain the point, topmost first.
+        """
+        size = self.cell_size
+        bucket = self.cells.get((math.floor(x / size), math.floor(y / size)))
+        if not bucket:
+            return []
+        entries = self.entries
+        hits = []
+        for key in bucket:
+            (rx, ry, rw, rh), cells, order = entries[key]
+            if rx <= x < rx + rw and ry <= y < ry + rh:
+                hits.append((order, key))
+        if len(hits) > 1:
+            hits.sort(key=lambda hit: hit[0], reverse=True)
+        return [key for order, key in hits]
+
+    def topmost(self, x, y, accept=None):
+        """
+        Returns the topmost key under the point for which the optional
+        `accept` function returns True, or `None`.
+        """
+        for key in self.query(x, y):
+            if accept is None or accept(key):
+                return key
+        return None
+
+    def _cells_for(self, rect):
+        x, y, w, h = rect
+        size = self.cell_size
+        if w <= 0 or h <= 0:
+            return frozenset()
+        first_col = math.floor(x / size)
+        last_col = math.ceil((x + w) / size) - 1
+        first_row = math.floor(y / size)
+        last_row = math.ceil((y + h) / size) - 1
+        return frozenset(
+            (col, row)
+            for col in range(first_col, last_col + 1)
+            for row in range(first_row, last_row + 1)
+        )
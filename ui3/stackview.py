@@ -0,0 +1,181 @@
+import objc_util
+import ui
+
+
+class StackView(ui.View):
+    '''Places subviews in a vertical or horizontal stack.
+
+    Unlike a chain of anchor constraints, the stack is measured and arranged
+    in a single pass in `layout`. Intrinsic sizes of the subviews are cached,
+    and only subviews marked dirty with `invalidate` are measured again.
+    '''
+
+    VERTICAL = 'vertical'
+    HORIZONTAL = 'horizontal'
+
+    # Alignment across the stack axis
+    FILL = 'fill'
+    START = 'start'
+    CENTER = 'center'
+    END = 'end'
+
+    # Distribution along the stack axis (START, CENTER and END also apply)
+    EQUAL = 'equal'
+    SPREAD = 'spread'
+
+    MARGIN = 8
+    TIGHT = 0
+
+    def __init__(self,
+                 axis=VERTICAL,
+                 alignment=FILL,
+                 distribution=START,
+                 spacing=MARGIN,
+                 margin=MARGIN,
+                 **kwargs):
+        '''By default, subviews are stacked from the top, with their intrinsic
+        height and stretched to the width of the stack.
+
+        Parameters:
+
+          * `axis` - `VERTICAL` (the default) or `HORIZONTAL`
+          * `alignment` - Placement across the axis: `FILL`, `START`, `CENTER`
+            or `END`
+          * `distribution` - Placement along the axis:
+            * `START`, `CENTER`, `END` - Intrinsic sizes, packed together
+            * `FILL` - Intrinsic sizes, last subview takes the remaining space
+            * `EQUAL` - All subviews share the available space equally
+            * `SPREAD` - Intrinsic sizes, remaining space spread evenly
+              between the subviews
+          * `spacing` - Gap between subviews
+          * `margin` - Gap between the subviews and the edges of the stack
+        '''
+
+        self._intrinsic = {}
+        self._dirty = set()
+
+        super().__init__(**kwargs)
+
+        self.axis = axis
+        self.alignment = alignment
+        self.distribution = distribution
+        self.spacing = spacing
+        self.margin = margin
+
+    def add_subview(self, subview):
+        super().add_subview(subview)
+        self.invalidate(subview)
+
+    def remove_subview(self, subview):
+        super().remove_subview(subview)
+        self._intrinsic.pop(subview, None)
+        self._dirty.discard(subview)
+        self.set_needs_layout()
+
+    def invalidate(self, *subviews):
+        '''Mark subviews as needing to be measured again, e.g. after changing
+        the text of a label. With no arguments, all subviews are marked.'''
+        self._dirty.update(subviews or self.subviews)
+        self.set_needs_layout()
+
+    def set_needs_layout(self):
+        self.objc_instance.setNeedsLayout()
+
+    def measure(self, view, available):
+        '''Returns the intrinsic `(width, height)` of the view. `available`
+        is the space across the stack axis, used to measure e.g. wrapping
+        labels.
+
+        Override to provide custom measurements.'''
+        if self.axis == self.VERTICAL:
+            fit = view.objc_instance.sizeThatFits_(
+                objc_util.CGSize(available, 0))
+        else:
+            fit = view.objc_instance.sizeThatFits_(
+                objc_util.CGSize(0, available))
+        return fit.width, fit.height
+
+    def intrinsic_size(self, view, available):
+        cached = self._intrinsic.get(view)
+        if (view in self._dirty or cached is None or
+        cached[0] != available):
+            cached = (available, self.measure(view, available))
+            self._intrinsic[view] = cached
+            self._dirty.discard(view)
+        return cached[1]
+
+    def content_size(self):
+        '''Size the stack needs along its axis to show all subviews with
+        their intrinsic sizes, as a `(width, height)` tuple.'''
+        vertical = self.axis == self.VERTICAL
+        available = self._cross_available()
+        sizes = self._main_sizes(available)
+        main = (sum(sizes) + 2 * self.margin +
+                max(0, len(sizes) - 1) * self.spacing)
+        return (self.width, main) if vertical else (main, self.height)
+
+    def _cross_available(self):
+        borders = 2 * self.border_width
+        cross = self.width if self.axis == self.VERTICAL else self.height
+        return max(0, cross - borders - 2 * self.margin)
+
+    def _main_sizes(self, available):
+        index = 1 if self.axis == self.VERTICAL else 0
+        return [
+            self.intrinsic_size(view, available)[index]
+            for view in self.subviews
+            if not view.hidden
+        ]
+
+    def layout(self):
+        views = [view for view in self.subviews if not view.hidden]
+        count = len(views)
+        if count == 0: return
+
+        vertical = self.axis == self.VERTICAL
+        borders = 2 * self.border_width
+        available = self._cross_available()
+
+        intrinsic = [self.intrinsic_size(view, available) for view in views]
+        main_index, cross_index = (1, 0) if vertical else (0, 1)
+
+        total_main = (self.height if vertical else self.width) - borders
+        free_main = total_main - 2 * self.margin - (count - 1) * self.spacing
+        sizes = [size[main_index] for size in intrinsic]
+        leftover = free_main - sum(sizes)
+
+        position = self.border_width + self.margin
+        spacing = self.spacing
+        distribution = self.distribution
+        if distribution == self.EQUAL:
+            sizes = [max(0, free_main / count)] * count
+        elif distribution == self.FILL:
+            sizes[-1] = max(0, sizes[-1] + leftover)
+        elif distribution == self.SPREAD and count > 1:
+            spacing += max(0, leftover) / (count - 1)
+        elif distribution == self.CENTER:
+            position += leftover / 2
+        elif distribution == self.END:
+            position += leftover
+
+        cross_start = self.border_width + self.margin
+        for view, size, main_size in zip(views, intrinsic, sizes):
+            cross_size = size[cross_index]
+            alignment = self.alignment
+            if alignment == self.FILL:
+                cross_size = available
+                cross = cross_start
+            elif alignment == self.CENTER:
+                cross = cross_start + (available - cross_size) / 2
+            elif alignment == self.END:
+                cross = cross_start + available - cross_size
+            else:
+                cross = cross_start
+
+            if vertical:
+                frame = (cross, position, cross_size, main_size)
+            else:
+                frame = (position, cross, main_size, cross_size)
+            if tuple(view.frame) != frame:
+                view.frame = frame
+            position += main_size + spacing
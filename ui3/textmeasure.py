@@ -0,0 +1,124 @@
+"""
+Cached text measurement for the `text_width` and `text_height` anchors
+
+Measuring is delegated to a function with the signature
+`measure(view, width, height) -> (width, height)`. In Pythonista this is a
+call to the ObjC `sizeThatFits:`, and `MonospaceMeasure` is a deterministic
+stand-in that can be used to test and benchmark the cache elsewhere.
+"""
+
+from ui3.cache import LRUCache
+
+
+class TextMeasureCache:
+    """
+    LRU cache of text sizes keyed by text, font and the constraining
+    dimension.
+
+    The last key measured for each view is remembered on the view, and the
+    stale entry is dropped when the text or font of the view changes.
+
+    Views that show attributed text, like `RichLabel`, identify its
+    formatting with an `attributed_text_key` attribute, which becomes part
+    of the key.
+    """
+
+    def __init__(self, measure, maxsize=512):
+        self.measure = measure
+        self.cache = LRUCache(maxsize)
+
+    def size(self, view, width=0, height=0):
+        """
+        Returns the `(width, height)` needed to show the text of the view,
+        constrained to `width` or `height` (0 for unconstrained).
+        """
+        key = self.key(view, width, height)
+        previous = getattr(view, '_text_measure_key', None)
+        if previous != key:
+            if previous is not None and previous[:-2] != key[:-2]:
+                self.cache.discard(previous)
+            view._text_measure_key = key
+        size = self.cache.get(key)
+        if size is None:
+            size = tuple(self.measure(view, width, height))
+            self.cache.put(key, size)
+        return size
+
+    @staticmethod
+    def key(view, width, height):
+        text = getattr(view, 'text', None)
+        if text is None:
+            text = getattr(view, 'title', None)
+        return (
+            type(view).__name__,
+            text,
+            getattr(view, 'font', None),
+            getattr(view, 'attributed_text_key', None),
+            getattr(view, 'number_of_lines', 1),
+            width,
+            height,
+        )
+
+    def invalidate(self, view=None):
+        """
+        Drop the cached size of the view, or everything if no view is given.
+        """
+        if view is None:
+            self.cache.clear()
+            return
+        key = getattr(view, '_text_measure_key', None)
+        if key is not None:
+            self.cache.discard(key)
+            view._text_measure_key = None
+
+
+class MonospaceMeasure:
+    """
+    Headless text measurement stand-in.
+
+    Every character is `char_width` times the font size wide and every line
+    `line_height` times the font size high. Text is wrapped at word
+    boundaries when a width is given.
+    """
+
+    def __init__(self, char_width=0.6, line_height=1.2):
+        self.char_width = char_width
+        self.line_height = line_height
+        self.calls = 0
+
+    def __call__(self, view, width=0, height=0):
+        self.calls += 1
+        text = getattr(view, 'text', None) or ''
+        font = getattr(view, 'font', None) or ('<system>', 17)
+        char_width = font[1] * self.char_width
+        max_chars = int(width // char_width) if width else 0
+
+        lines = []
+        for paragraph in text.split('\n'):
+            lines.extend(self._wrap(paragraph, max_chars))
+
+        number_of_lines = getattr(view, 'number_of_lines', 0)
+        if number_of_lines:
+            lines = lines[:number_of_lines]
+
+        longest = max((len(line) for line in lines), default=0)
+        return (
+            longest * char_width,
+            len(lines) * font[1] * self.line_height,
+        )
+
+    @staticmethod
+    def _wrap(paragraph, max_chars):
+        if not max_chars or len(paragraph) <= max_chars:
+            return [paragraph]
+        lines = []
+        line = ''
+        for word in paragraph.split(' '):
+            candidate = f'{line} {word}' if line else word
+            if len(candidate) <= max_chars or not line:
+                line = candidate
+            else:
+                lines.append(line)
+                line = word
+        lines.append(line)
+        return lines
@@ -0,0 +1,202 @@
+"""
+Attribute runs for attributed strings
+
+Nested formatting like `<b>Bold <c red>red</c></b>` gives overlapping spans
+of attributes. `build_runs` merges them into contiguous, non-overlapping runs
+that cover the whole text, each with its final attributes, so that an
+attributed string can be built with one call per run instead of one call per
+attribute of every span.
+
+Attribute values are plain Python values: numbers, or tuples that describe
+ObjC objects without creating them (e.g. `('color', 1.0, 0.0, 0.0, 1.0)`).
+This keeps runs hashable, comparable and usable without Pythonista.
+
+Run and diff positions are Python string indices, i.e. code points. NSString
+ranges count UTF-16 code units instead, where characters outside the Basic
+Multilingual Plane, like most emoji, take two units; `utf16_offsets`
+converts between the two.
+"""
+
+import collections
+
+
+class Run(collections.namedtuple('Run', 'start end attributes')):
+    """
+    Range of text from `start` (inclusive) to `end` (exclusive) with the same
+    `attributes`, a tuple of `(key, value)` pairs sorted by key.
+    """
+
+    __slots__ = ()
+
+    @property
+    def length(self):
+        return self.end - self.start
+
+    def shifted(self, offset):
+        return Run(self.start + offset, self.end + offset, self.attributes)
+
+
+class RunStats(collections.namedtuple(
+        'RunStats', 'attribute_calls run_calls')):
+    """
+    ObjC calls needed to apply the spans one attribute at a time, and the
+    runs one run at a time.
+    """
+
+    __slots__ = ()
+
+    @property
+    def saved(self):
+        return self.attribute_calls - self.run_calls
+
+
+def build_runs(length, spans):
+    """
+    Returns the list of `Run`s covering text of the given `length`.
+
+    `spans` is a sequence of `(start, end, attributes)`, where attributes is
+    a dict, in the order the spans would be applied: where spans overlap, a
+    later span overrides the values of an earlier span for the same key.
+    Ranges without attributes are included as runs with empty attributes, and
+    adjacent runs with the same attributes are merged.
+    """
+    if length <= 0:
+        return []
+
+    starting = collections.defaultdict(list)
+    ending = collections.defaultdict(list)
+    boundaries = {0, length}
+    for order, (start, end, attributes) in enumerate(spans):
+        start, end = max(0, start), min(length, end)
+        if end <= start or not attributes:
+            continue
+        starting[start].append(order)
+        ending[end].append(order)
+        boundaries.add(start)
+        boundaries.add(end)
+    span_attributes = [attributes for _, _, attributes in spans]
+
+    runs = []
+    active = []
+    boundaries = sorted(boundaries)
+    for start, end in zip(boundaries, boundaries[1:]):
+        changed = False
+        for order in ending.get(start, ()):
+            active.remove(order)
+            changed = True
+        for order in starting.get(start, ()):
+            active.append(order)
+            changed = True
+        if changed or not runs:
+            active.sort()
+            merged = {}
+            for order in active:
+                merged.update(span_attributes[order])
+            attributes = tuple(sorted(merged.items()))
+        if runs and runs[-1].attributes == attributes:
+            runs[-1] = Run(runs[-1].start, end, attributes)
+        else:
+            runs.append(Run(start, end, attributes))
+    return runs
+
+
+def _same_offset(index):
+    return index
+
+
+def utf16_offsets(text):
+    """
+    Returns a function that converts string indices of `text` into UTF-16
+    offsets, for `NSRange`s.
+    """
+    if text.isascii() or len(text.encode('utf-16-le')) == 2 * len(text):
+        return _same_offset
+    offsets = [0]
+    offset = 0
+    for character in text:
+        offset += 2 if ord(character) > 0xFFFF else 1
+        offsets.append(offset)
+    return offsets.__getitem__
+
+
+def utf16_length(text):
+    return len(text.encode('utf-16-le')) // 2
+
+
+def run_stats(spans, runs):
+    return RunStats(
+        attribute_calls=sum(len(attributes) for _, _, attributes in spans),
+        run_calls=sum(1 for run in runs if run.attributes),
+    )
+
+
+class UpdateStats(collections.namedtuple('UpdateStats', 'characters runs')):
+    """
+    Size of an incremental update: `characters` replaced, counting the
+    longer of the old and new versions of the changed range, and `runs`
+    whose attributes were set.
+    """
+
+    __slots__ = ()
+
+
+def diff_text(old, new):
+    """
+    Returns `(start, old_end, new_end)`: the range `old[start:old_end]` that
+    has to be replaced with `new[start:new_end]` to turn `old` into `new`,
+    found by trimming the common prefix and suffix.
+    """
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start] == new[start]:
+        start += 1
+    old_end, new_end = len(old), len(new)
+    while old_end > start and new_end > start and \
+            old[old_end - 1] == new[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+    return start, old_end, new_end
+
+
+def diff_runs(old_runs, new_runs, edit):
+    """
+    Returns the runs of `new_runs` that have to be set after the text edit
+    `(start, old_end, new_end)` from `diff_text` has been applied to text
+    formatted with `old_runs`.
+
+    A run can be skipped if it does not overlap the replaced characters and
+    the old runs already give all of its characters the same attributes.
+    Runs with empty attributes are included when they need to clear old
+    attributes.
+    """
+    start, old_end, new_end = edit
+    shift = new_end - old_end
+
+    # Old runs in the coordinates of the edited text, without the edit
+    current = []
+    for run in old_runs:
+        if run.start < start:
+            current.append(Run(run.start, min(run.end, start), run.attributes))
+        if run.end > old_end:
+            current.append(
+                Run(max(run.start, old_end), run.end, run.attributes)
+                .shifted(shift))
+
+    changed = []
+    i = 0
+    for run in new_runs:
+        if run.start < new_end and run.end > start and new_end > start:
+            changed.append(run)
+            continue
+        while i < len(current) and current[i].end <= run.start:
+            i += 1
+        position = run.start
+        j = i
+        while position < run.end and j < len(current) and \
+                current[j].start <= position and \
+                current[j].attributes == run.attributes:
+            position = current[j].end
+            j += 1
+        if position < run.end:
+            changed.append(run)
+    return changed